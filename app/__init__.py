@@ -1,25 +1,32 @@
 from flask import Flask
+from .core.startup import startup_phase, log_startup_report
 from .core.config import Config
-from .core.extensions import db, migrate, mail, login_manager
-from .api.chat import chat_bp
-from .api.auth import auth_bp
-from .api.memory import memory_bp # Import new memory blueprint
+from .core.extensions import db, migrate, mail, login_manager, task_queue
+
+with startup_phase('import blueprints'):
+    from .api.chat import chat_bp
+    from .api.auth import auth_bp
+    from .api.memory import memory_bp # Import new memory blueprint
 from .models.user import User
+from .core.user_cache import user_cache
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
 
     # Initialize extensions
-    db.init_app(app)
-    migrate.init_app(app, db)
-    mail.init_app(app)
-    login_manager.init_app(app)
-    login_manager.login_view = 'auth.login'
+    with startup_phase('init extensions'):
+        db.init_app(app)
+        migrate.init_app(app, db)
+        mail.init_app(app)
+        login_manager.init_app(app)
+        login_manager.login_view = 'auth.login'
+        task_queue.init_app(app)
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Served from a short TTL cache; this runs on every authenticated request
+        return user_cache.get_user(int(user_id))
 
     # Register blueprints
     app.register_blueprint(chat_bp, url_prefix='/api')
@@ -30,8 +37,21 @@ def create_app():
     from .routes import main_bp
     app.register_blueprint(main_bp)
 
+    # Register CLI commands
+    from .commands import dedupe_memories_command, explain_hot_queries_command
+    app.cli.add_command(dedupe_memories_command)
+    app.cli.add_command(explain_hot_queries_command)
+
     with app.app_context():
         # db.create_all() # This can be handled by migrations
         pass
 
+    if app.config['EMBEDDER_WARMUP']:
+        # Load the embedding model on a background thread so the first research query doesn't pay for it
+        from .services.embedding_service import warm_up_embedder
+        warm_up_embedder(background=True)
+
+    if app.config['STARTUP_REPORT']:
+        log_startup_report()
+
     return app
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify, session
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash
 from app.core.extensions import db, mail
+from app.core.user_cache import user_cache
 from app.models import User
 from flask_mail import Message as MailMessage
 import re
@@ -115,6 +116,7 @@ def login():
 def logout():
     """User logout endpoint"""
     try:
+        user_cache.invalidate(current_user.id)
         logout_user()
         return jsonify({"success": True, "message": "Logout successful"})
     except Exception as e:
@@ -160,6 +162,7 @@ def update_profile():
                 current_user.email = new_email
         
         db.session.commit()
+        user_cache.invalidate(current_user.id)
         
         return jsonify({
             "success": True,
@@ -1,15 +1,24 @@
 import os
-import json
-from flask import Blueprint, request, jsonify, stream_with_context, Response, current_app
+from flask import Blueprint, request, jsonify, Response, current_app
+from flask.globals import request_ctx
 from flask_login import login_required, current_user
 from werkzeug.utils import secure_filename
+from sqlalchemy import func
 from app.services.chat_service import ChatService
 from app.models import Chat, Message
-from app.core.extensions import db
+from app.core.extensions import db, task_queue
+from app.core.pagination import encode_cursor, decode_cursor, keyset_page
+from app.core.sse import SSEStream, start_generation
+from app.core.conditional import fingerprint, not_modified, with_etag
+from app.core.stream_buffer import get_stream_buffer
+from datetime import datetime
 
 chat_bp = Blueprint('chat', __name__)
 chat_service = ChatService()
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'png', 'jpg', 'jpeg', 'gif', 'py', 'js', 'html', 'css', 'java', 'cpp', 'c'}
 
 def allowed_file(filename):
@@ -30,17 +39,52 @@ def chat():
     if not query and not data.get('is_file_upload_message'):
         return jsonify({"error": "Message is required"}), 400
 
+    # The service runs in a background generation thread, under a copy of this request's context
+    ctx = request_ctx.copy()
+
     def generate():
         """Yields a stream of structured JSON events from the service."""
-        try:
+        with ctx:
             # NEW: Pass the flag to the service
-            for event in chat_service.get_response(query, chat_id, use_search, is_research_mode):
-                yield f'data: {json.dumps(event)}\n\n'
-        except Exception as e:
-            current_app.logger.error(f"Error in chat stream: {e}", exc_info=True)
-            yield f'data: {json.dumps({"type": "error", "message": "An unexpected error occurred on the server."})}\n\n'
+            yield from chat_service.get_response(query, chat_id, use_search, is_research_mode)
+
+    generation_id = start_generation(generate, owner_id=current_user.id)
+    return _sse_response(SSEStream(generation_id), generation_id)
+
+
+@chat_bp.route('/chat/streams/<generation_id>', methods=['GET'])
+@login_required
+def resume_chat_stream(generation_id):
+    """Resume a chat response stream after the event id in the Last-Event-ID header."""
+    if get_stream_buffer().owner(generation_id) != current_user.id:
+        return jsonify({"error": "Stream not found or expired"}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or '0'
+    try:
+        after_id = int(last_event_id)
+    except ValueError:
+        return jsonify({"error": "Invalid Last-Event-ID"}), 400
+
+    return _sse_response(SSEStream(generation_id, after_id=after_id), generation_id)
+
 
-    return Response(stream_with_context(generate()), mimetype='text/event-stream')
+@chat_bp.route('/chat/streams/<generation_id>', methods=['DELETE'])
+@login_required
+def cancel_chat_stream(generation_id):
+    """Stop a running generation, e.g. when the user cancels the response."""
+    buffer = get_stream_buffer()
+    if buffer.owner(generation_id) != current_user.id:
+        return jsonify({"error": "Stream not found or expired"}), 404
+    buffer.cancel(generation_id)
+    return jsonify({"success": True})
+
+
+def _sse_response(stream: SSEStream, generation_id: str) -> Response:
+    response = Response(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # let nginx pass frames through unbuffered
+    response.headers['X-Generation-Id'] = generation_id
+    return response
 
 
 @chat_bp.route('/upload', methods=['POST'])
@@ -88,15 +132,34 @@ def upload_file():
 @chat_bp.route('/chats', methods=['GET'])
 @login_required
 def get_chats():
-    """Get user's chat history"""
+    """Get user's chat history, most recently updated first, one page at a time"""
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
     try:
-        chats = Chat.query.filter_by(user_id=current_user.id).order_by(Chat.updated_at.desc()).all()
+        before = decode_cursor(request.args.get('before'), datetime, int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # Any new, renamed or deleted chat changes the newest updated_at, the count or the newest id
+        newest, count, last_id = db.session.query(
+            func.max(Chat.updated_at), func.count(Chat.id), func.max(Chat.id)
+        ).filter(Chat.user_id == current_user.id).one()
+        etag = fingerprint(current_user.id, newest, count, last_id)
+        cached = not_modified(etag, weak=True)
+        if cached is not None:
+            return cached
+
+        chats, has_more = keyset_page(
+            Chat.query.filter_by(user_id=current_user.id),
+            [Chat.updated_at, Chat.id], before, limit
+        )
         chat_list = [{
             'id': chat.id,
             'title': chat.title,
             'updated_at': chat.updated_at.isoformat()
         } for chat in chats]
-        return jsonify({"chats": chat_list})
+        next_cursor = encode_cursor(chats[-1].updated_at, chats[-1].id) if has_more else None
+        return with_etag(jsonify({"chats": chat_list, "next_cursor": next_cursor}), etag, weak=True)
     except Exception as e:
         return jsonify({"error": f"Error retrieving chats: {str(e)}"}), 500
 
@@ -140,15 +203,53 @@ def delete_chat(chat_id):
 @chat_bp.route('/chats/<int:chat_id>/messages', methods=['GET'])
 @login_required
 def get_chat_messages(chat_id):
-    """Get messages for a specific chat"""
+    """
+    Get messages for a specific chat. Returns the newest page (or the page before
+    the `before` cursor) in chronological order, with a cursor for older messages.
+    """
+    limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+    try:
+        before = decode_cursor(request.args.get('before'), datetime, int)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         chat = Chat.query.filter_by(id=chat_id, user_id=current_user.id).first()
         if not chat:
             return jsonify({"error": "Chat not found"}), 404
 
-        messages = Message.query.filter_by(chat_id=chat_id).order_by(Message.created_at.asc()).all()
+        # Messages are only ever appended (or deleted with their chat), so the newest id and count identify the history
+        last_id, count = db.session.query(
+            func.max(Message.id), func.count(Message.id)
+        ).filter(Message.chat_id == chat_id).one()
+        etag = fingerprint(chat_id, last_id, count)
+        cached = not_modified(etag, weak=True)
+        if cached is not None:
+            return cached
+
+        messages, has_more = keyset_page(
+            Message.query.filter_by(chat_id=chat_id),
+            [Message.created_at, Message.id], before, limit
+        )
+        next_cursor = encode_cursor(messages[-1].created_at, messages[-1].id) if has_more else None
+        messages.reverse()
         message_list = [{'id': msg.id, 'role': msg.role, 'content': msg.content} for msg in messages]
 
-        return jsonify({"messages": message_list})
+        return with_etag(jsonify({"messages": message_list, "next_cursor": next_cursor}), etag, weak=True)
     except Exception as e:
-        return jsonify({"error": f"Error retrieving messages: {str(e)}"}), 500
\ No newline at end of file
+        return jsonify({"error": f"Error retrieving messages: {str(e)}"}), 500
+
+
+@chat_bp.route('/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job_status(job_id):
+    """Poll the status of a background post-processing job (e.g. title generation)"""
+    job = task_queue.get_job(job_id)
+    if not job or job['payload'].get('user_id') != current_user.id:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify({
+        "id": job['id'],
+        "status": job['status'],
+        "result": job['result'] if job['status'] == 'done' else None
+    })
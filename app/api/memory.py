@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_login import login_required, current_user
 from app.services.memory_service import UserMemoryService
+from app.core.conditional import fingerprint, not_modified, with_etag
 
 memory_bp = Blueprint('memory', __name__)
 memory_service = UserMemoryService()
@@ -8,33 +9,45 @@ memory_service = UserMemoryService()
 @memory_bp.route('/memories', methods=['GET'])
 @login_required
 def get_memories():
-    """Get all of a user's memories, with optional category filtering."""
+    """Get a page of the user's memories, with optional category filtering and total count."""
     category_id = request.args.get('category_id', type=int)
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    limit = request.args.get('limit', request.args.get('per_page', 20, type=int), type=int)
+    limit = min(max(limit, 1), 100)
+    include_total = request.args.get('include_total', 'false').lower() in ('1', 'true', 'yes')
 
-    if category_id:
-        memories_pagination = memory_service.get_memories_by_category(current_user.id, category_id, page, per_page)
-    else:
-        memories_pagination = memory_service.get_all_memories(current_user.id, page, per_page)
-    
-    return jsonify({
+    # Category names are part of the payload, so the registry's etag is folded in too
+    etag = fingerprint(current_user.id, memory_service.get_memories_version(current_user.id),
+                       memory_service.get_all_categories()[1])
+    cached = not_modified(etag, weak=True)
+    if cached is not None:
+        return cached
+
+    try:
+        page = memory_service.list_memories(
+            current_user.id, category_id=category_id, limit=limit,
+            cursor=request.args.get('before'), include_total=include_total
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    category_names = memory_service.get_category_names()
+    response = {
         "memories": [{
             "id": mem.id,
             "title": mem.title,
             "content": mem.content,
             "category_id": mem.category_id,
-            "category_name": mem.category.name,
+            "category_name": category_names.get(mem.category_id),
             "importance_score": mem.importance_score,
             "is_verified": mem.is_verified,
             "last_accessed_at": mem.last_accessed_at.isoformat()
-        } for mem in memories_pagination.items],
-        "total": memories_pagination.total,
-        "page": memories_pagination.page,
-        "pages": memories_pagination.pages,
-        "has_next": memories_pagination.has_next,
-        "has_prev": memories_pagination.has_prev
-    })
+        } for mem in page["memories"]],
+        "next_cursor": page["next_cursor"],
+        "has_next": page["next_cursor"] is not None
+    }
+    if include_total:
+        response["total"] = page["total"]
+    return with_etag(jsonify(response), etag, weak=True)
 
 @memory_bp.route('/memories', methods=['POST'])
 @login_required
@@ -90,6 +103,9 @@ def verify_memory(memory_id):
 @memory_bp.route('/memories/categories', methods=['GET'])
 @login_required
 def get_memory_categories():
-    """Get all available memory categories."""
-    categories = memory_service.get_all_categories()
-    return jsonify([{"id": cat.id, "name": cat.name, "description": cat.description} for cat in categories])
+    """Get all available memory categories, answering 304 when the client's ETag is current."""
+    categories, etag = memory_service.get_all_categories()
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    return with_etag(jsonify(categories), etag)
@@ -0,0 +1,133 @@
+import click
+from flask.cli import with_appcontext
+from app.services.memory_dedup import MemoryDeduplicator
+
+
+@click.command('dedupe-memories')
+@click.option('--user-id', type=int, default=None, help='Only dedupe this user\'s memories.')
+@click.option('--threshold', type=float, default=None, help='Cosine similarity at which two memories are merged.')
+@with_appcontext
+def dedupe_memories_command(user_id, threshold):
+    """Merge near-duplicate memories already stored in the database."""
+    deduplicator = MemoryDeduplicator(threshold=threshold)
+    if user_id:
+        removed = deduplicator.dedupe_user(user_id)
+    else:
+        removed = deduplicator.dedupe_all()
+    click.echo(f"Merged {removed} near-duplicate memories.")
+
+
+def _hot_queries(user_id, chat_id, category_id):
+    """
+    The chat and memory queries run on every request, as SQLAlchemy query objects.
+    Paginated listings are built with keyset_query exactly as the API runs them, both for
+    the first page and for a later page (with a cursor).
+    """
+    from datetime import datetime, timezone
+    from app.core.pagination import keyset_query
+    from app.models import Chat, Message, UserMemory
+
+    now = datetime.now(timezone.utc)
+    chats = Chat.query.filter_by(user_id=user_id)
+    messages = Message.query.filter_by(chat_id=chat_id)
+    memories = UserMemory.query.filter_by(user_id=user_id, is_active=True)
+    category_memories = UserMemory.query.filter_by(user_id=user_id, category_id=category_id, is_active=True)
+    chat_columns = [Chat.updated_at, Chat.id]
+    message_columns = [Message.created_at, Message.id]
+    memory_columns = [UserMemory.last_accessed_at, UserMemory.id]
+    category_columns = [UserMemory.importance_score, UserMemory.last_accessed_at, UserMemory.id]
+    return {
+        'chat list': keyset_query(chats, chat_columns, None, 50),
+        'chat list (next page)': keyset_query(chats, chat_columns, (now, 2 ** 31), 50),
+        'recent messages': Message.query.filter_by(chat_id=chat_id).order_by(Message.created_at.desc()).limit(10),
+        'chat messages': keyset_query(messages, message_columns, None, 50),
+        'chat messages (next page)': keyset_query(messages, message_columns, (now, 2 ** 31), 50),
+        'relevant memories': UserMemory.query.filter_by(user_id=user_id, is_active=True, is_verified=True).order_by(
+            UserMemory.importance_score.desc(), UserMemory.last_accessed_at.desc()).limit(5),
+        'memory list': keyset_query(memories, memory_columns, None, 20),
+        'memory list (next page)': keyset_query(memories, memory_columns, (now, 2 ** 31), 20),
+        'memory category list': keyset_query(category_memories, category_columns, None, 20),
+        'memory category list (next page)': keyset_query(category_memories, category_columns, (0.5, now, 2 ** 31), 20),
+    }
+
+
+def _seed_explain_data(chats, messages_per_chat, memories):
+    """Insert a throwaway user with a realistic amount of history; the caller rolls it back"""
+    import uuid
+    from datetime import datetime, timedelta, timezone
+    from app.core.extensions import db
+    from app.models import User, Chat, Message, UserMemory, MemoryCategory
+
+    user = User(username=f'explain-{uuid.uuid4().hex[:12]}', email=f'{uuid.uuid4().hex[:12]}@explain.invalid')
+    db.session.add(user)
+    category = MemoryCategory.query.first()
+    if category is None:
+        category = MemoryCategory(name=f'explain-{uuid.uuid4().hex[:8]}')
+        db.session.add(category)
+    db.session.flush()
+
+    now = datetime.now(timezone.utc)
+    chat_rows = [{'user_id': user.id, 'title': f'Chat {i}', 'created_at': now - timedelta(hours=i),
+                  'updated_at': now - timedelta(hours=i)} for i in range(chats)]
+    db.session.execute(db.insert(Chat), chat_rows)
+    chat_ids = [cid for cid, in db.session.query(Chat.id).filter_by(user_id=user.id)]
+
+    for chat_id in chat_ids:
+        db.session.execute(db.insert(Message), [
+            {'chat_id': chat_id, 'role': 'user' if i % 2 == 0 else 'assistant', 'content': f'Message {i}',
+             'created_at': now - timedelta(minutes=messages_per_chat - i)}
+            for i in range(messages_per_chat)
+        ])
+    db.session.execute(db.insert(UserMemory), [
+        {'user_id': user.id, 'category_id': category.id, 'title': f'Fact {i}', 'content': f'Fact {i}',
+         'importance_score': (i % 10) / 10, 'is_verified': i % 3 == 0, 'is_active': True,
+         'last_accessed_at': now - timedelta(minutes=i)}
+        for i in range(memories)
+    ])
+    return user.id, chat_ids[0], category.id
+
+
+@click.command('explain-hot-queries')
+@click.option('--chats', default=200, help='Chats to seed for the throwaway user.')
+@click.option('--messages-per-chat', default=100, help='Messages to seed per chat.')
+@click.option('--memories', default=2000, help='Memories to seed for the throwaway user.')
+@with_appcontext
+def explain_hot_queries_command(chats, messages_per_chat, memories):
+    """
+    Seed a throwaway user, print the query plans of the chat and memory hot paths
+    and exit non-zero if any of them can only be served by a full table scan.
+    All seeded rows are rolled back.
+    """
+    from sqlalchemy import text
+    from app.core.extensions import db
+
+    dialect = db.engine.dialect.name
+    failures = []
+    try:
+        user_id, chat_id, category_id = _seed_explain_data(chats, messages_per_chat, memories)
+        if dialect == 'postgresql':
+            db.session.execute(text('ANALYZE chat, message, user_memories'))
+
+        for name, query in _hot_queries(user_id, chat_id, category_id).items():
+            sql = str(query.statement.compile(dialect=db.engine.dialect, compile_kwargs={'literal_binds': True}))
+            if dialect == 'postgresql':
+                plan = [row[0] for row in db.session.execute(text(f'EXPLAIN {sql}'))]
+                # With sequential scans disabled, a remaining Seq Scan means no usable index exists
+                db.session.execute(text('SET LOCAL enable_seqscan = off'))
+                forced = [row[0] for row in db.session.execute(text(f'EXPLAIN {sql}'))]
+                db.session.execute(text('SET LOCAL enable_seqscan = on'))
+                uses_full_scan = any('Seq Scan' in line for line in forced)
+            else:
+                plan = [row[-1] for row in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+                uses_full_scan = any(line.startswith('SCAN') and 'USING' not in line for line in plan)
+
+            status = 'FULL SCAN' if uses_full_scan else 'ok'
+            click.echo(f"\n== {name} [{status}]\n" + "\n".join(f"   {line}" for line in plan))
+            if uses_full_scan:
+                failures.append(name)
+    finally:
+        db.session.rollback()
+
+    if failures:
+        raise click.ClickException(f"Queries without a usable index: {', '.join(failures)}")
+    click.echo("\nAll hot queries are served by an index.")
@@ -0,0 +1,26 @@
+import hashlib
+from typing import Optional
+from flask import request, Response
+
+
+def fingerprint(*parts) -> str:
+    """Short stable hash of the values a response was built from, for use as an ETag"""
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def not_modified(etag: str, weak: bool = False) -> Optional[Response]:
+    """
+    Return a bodiless 304 response when the request's If-None-Match already holds `etag`,
+    so the caller can skip building and serialising the payload; otherwise None.
+    """
+    # If-None-Match always uses weak comparison (RFC 9110 13.1.2)
+    if request.if_none_match.contains_weak(etag):
+        return with_etag(Response(status=304), etag, weak)
+    return None
+
+
+def with_etag(response: Response, etag: str, weak: bool = False) -> Response:
+    """Tag a JSON response; browsers keep it but revalidate before every reuse"""
+    response.set_etag(etag, weak=weak)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
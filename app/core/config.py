@@ -18,6 +18,16 @@ class Config:
     # Search Configuration
     SEARCH_PROVIDER = os.environ.get('SEARCH_PROVIDER', 'duckduckgo')  # duckduckgo, google_custom, web_scraping, fallback
 
+    # Startup behaviour
+    EMBEDDER_WARMUP = os.environ.get('EMBEDDER_WARMUP', 'false').lower() in ('1', 'true', 'yes')
+    STARTUP_REPORT = os.environ.get('STARTUP_REPORT', 'false').lower() in ('1', 'true', 'yes')
+
+    # Background jobs (post-response chat processing)
+    # local, sqlite; several gunicorn workers (WEB_CONCURRENCY) need the shared sqlite store
+    TASK_QUEUE_BACKEND = os.environ.get('TASK_QUEUE_BACKEND', 'sqlite' if int(os.environ.get('WEB_CONCURRENCY', 1)) > 1 else 'local')
+    TASK_QUEUE_PATH = os.environ.get('TASK_QUEUE_PATH', os.path.join('instance', 'tasks.sqlite3'))
+    TASK_QUEUE_WORKERS = int(os.environ.get('TASK_QUEUE_WORKERS', 2))
+
     # Session configuration
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
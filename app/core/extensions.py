@@ -2,8 +2,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_mail import Mail
 from flask_login import LoginManager
+from .tasks import TaskQueue
 
 db = SQLAlchemy()
 migrate = Migrate()
 mail = Mail()
-login_manager = LoginManager() 
\ No newline at end of file
+login_manager = LoginManager()
+task_queue = TaskQueue() 
\ No newline at end of file
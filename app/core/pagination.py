@@ -0,0 +1,52 @@
+import json
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import tuple_
+
+
+def encode_cursor(*values) -> str:
+    """Encode the sort-key values of the last row on a page into an opaque cursor string"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], *types) -> Optional[Tuple]:
+    """
+    Decode a cursor produced by encode_cursor, converting each value to the given type.
+    Returns None for an empty cursor and raises ValueError for a malformed one.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(payload, list) or len(payload) != len(types):
+            raise ValueError('cursor has the wrong number of values')
+        return tuple(
+            datetime.fromisoformat(value) if value_type is datetime else value_type(value)
+            for value, value_type in zip(payload, types)
+        )
+    except (TypeError, ValueError, json.JSONDecodeError, UnicodeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+
+def keyset_query(query, columns, cursor_values: Optional[Tuple], limit: int, descending: bool = True):
+    """
+    Return the query for one keyset page: rows after cursor_values, ordered by `columns`
+    (all in the same direction), with one extra row to tell whether another page follows.
+    """
+    if cursor_values is not None:
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*cursor_values) if descending else key > tuple_(*cursor_values))
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    return query.order_by(*ordering).limit(limit + 1)
+
+
+def keyset_page(query, columns, cursor_values: Optional[Tuple], limit: int, descending: bool = True):
+    """
+    Apply keyset pagination to a query ordered by `columns` (all in the same direction).
+    Returns (rows, has_more); rows holds at most `limit` items following cursor_values.
+    """
+    rows = keyset_query(query, columns, cursor_values, limit, descending).all()
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Optional
+
+
+class SQLiteConnections:
+    """
+    Per-thread connections to one WAL-mode SQLite file, shared by the on-disk caches, job
+    store and stream buffer. sqlite3 connections must not be shared between threads, and
+    WAL mode lets every worker process on the host read and write the same file.
+    """
+
+    def __init__(self, path: str, timeout: float = 5, synchronous: Optional[str] = 'NORMAL',
+                 isolation_level: Optional[str] = ''):
+        """
+        Args:
+            path: database file; its directory is created if needed
+            timeout: seconds to wait for another process's write lock
+            synchronous: PRAGMA synchronous value, or None to keep SQLite's default
+            isolation_level: passed to sqlite3.connect; None for autocommit mode
+        """
+        self.path = path
+        self.timeout = timeout
+        self.synchronous = synchronous
+        self.isolation_level = isolation_level
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=self.isolation_level)
+            conn.execute("PRAGMA journal_mode=WAL")
+            if self.synchronous:
+                conn.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.conn = conn
+        return conn
+
+
+class StatCounters:
+    """Named counters that can be bumped from several threads, for get_stats() reports"""
+
+    def __init__(self, *names: str):
+        self._values: Dict[str, int] = dict.fromkeys(names, 0)
+        self._lock = threading.Lock()
+
+    def add(self, name: str, amount: int = 1) -> None:
+        with self._lock:
+            self._values[name] += amount
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._values)
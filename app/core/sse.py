@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import uuid
+import threading
+import logging
+from typing import Callable, Iterable, Iterator, Optional
+from app.core.stream_buffer import get_stream_buffer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(payload) -> str:
+    """Serialise an event payload, with orjson when installed and enabled (SSE_JSON_ENCODER)"""
+    if orjson is not None and os.environ.get('SSE_JSON_ENCODER', 'auto').strip().lower() in ('auto', 'orjson'):
+        return orjson.dumps(payload).decode('utf-8')
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'))
+
+
+def format_event(payload, event_id=None) -> str:
+    """Render one SSE frame"""
+    frame = f"data: {dumps(payload)}\n\n"
+    return f"id: {event_id}\n{frame}" if event_id is not None else frame
+
+
+def start_generation(produce: Callable[[], Iterable[dict]], owner_id: int, buffer=None) -> str:
+    """
+    Run `produce` in a background thread, recording its events in the stream buffer under a
+    new generation id. The generation keeps running if the client disconnects, so the client
+    can resume it with SSEStream instead of asking for a second generation. It stops early
+    only when cancelled through the buffer.
+    """
+    buffer = buffer or get_stream_buffer()
+    generation_id = uuid.uuid4().hex
+    buffer.start(generation_id, owner_id)
+
+    def run():
+        events = produce()
+        try:
+            for event in events:
+                buffer.append(generation_id, event)
+                if buffer.is_cancelled(generation_id):
+                    try:
+                        events.close()
+                    except RuntimeError:
+                        pass  # the producer tried to yield from a finally block while closing
+                    break
+        except Exception as e:
+            logging.error(f"Error in chat stream: {e}", exc_info=True)
+            buffer.append(generation_id, {"type": "error", "message": "An unexpected error occurred on the server."})
+        finally:
+            buffer.append(generation_id, {"type": "done"})
+            buffer.finish(generation_id)
+
+    threading.Thread(target=run, daemon=True, name=f'sse-generation-{generation_id[:8]}').start()
+    return generation_id
+
+
+class SSEStream:
+    """
+    Serves one generation from the stream buffer as SSE frames, starting after `after_id`
+    (the client's Last-Event-ID when resuming).
+
+    Consecutive `response_chunk` events are merged until `coalesce_chars` of content are
+    buffered or `coalesce_ms` have passed since the first one; a merged frame takes the id
+    of its last event. A heartbeat comment is sent after `heartbeat_seconds` of silence so
+    idle proxies keep the connection open.
+    """
+
+    def __init__(self, generation_id: str, after_id: int = 0, buffer=None, coalesce_chars: int = None,
+                 coalesce_ms: int = None, heartbeat_seconds: float = None):
+        self.generation_id = generation_id
+        self.after_id = after_id
+        self.buffer = buffer or get_stream_buffer()
+        self.coalesce_chars = coalesce_chars if coalesce_chars is not None else int(os.environ.get('SSE_COALESCE_CHARS', 200))
+        self.coalesce_seconds = (coalesce_ms if coalesce_ms is not None else int(os.environ.get('SSE_COALESCE_MS', 50))) / 1000
+        self.heartbeat_seconds = heartbeat_seconds or float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+
+    def __iter__(self) -> Iterator[str]:
+        cursor = self.after_id
+        pending: Optional[str] = None
+        pending_id = None
+        flush_at = None
+        last_sent = time.monotonic()
+        first_read = True
+        while True:
+            now = time.monotonic()
+            deadline = flush_at if pending is not None else last_sent + self.heartbeat_seconds
+            result = self.buffer.read(self.generation_id, cursor, max(0.0, deadline - now))
+            if result is None:
+                yield format_event({"type": "resume_unavailable"})
+                return
+            events, finished, truncated = result
+            if truncated and first_read:
+                # The client's position already left the ring buffer; it has to reload instead
+                yield format_event({"type": "resume_unavailable"})
+                return
+            first_read = False
+
+            for event_id, event in events:
+                cursor = event_id
+                if isinstance(event, dict) and event.get("type") == "response_chunk" and self.coalesce_chars > 0:
+                    if pending is None:
+                        pending, flush_at = "", time.monotonic() + self.coalesce_seconds
+                    pending += event.get("content", "")
+                    pending_id = event_id
+                    if len(pending) >= self.coalesce_chars:
+                        yield format_event({"type": "response_chunk", "content": pending}, pending_id)
+                        pending, flush_at = None, None
+                        last_sent = time.monotonic()
+                    continue
+                if pending is not None:
+                    # Keep event order: buffered text goes out before any other event
+                    yield format_event({"type": "response_chunk", "content": pending}, pending_id)
+                    pending, flush_at = None, None
+                yield format_event(event, event_id)
+                last_sent = time.monotonic()
+
+            now = time.monotonic()
+            if pending is not None and (finished or now >= flush_at):
+                yield format_event({"type": "response_chunk", "content": pending}, pending_id)
+                pending, flush_at = None, None
+                last_sent = now
+            if finished and not events:
+                return
+            if pending is None and not events and now - last_sent >= self.heartbeat_seconds:
+                yield ": keep-alive\n\n"
+                last_sent = now
@@ -0,0 +1,41 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Any
+
+_phases: List[Dict[str, Any]] = []
+_phases_lock = threading.Lock()
+_process_start = time.monotonic()
+
+
+def record_startup_phase(name: str, seconds: float) -> None:
+    """Record how long a startup phase (import, model load, ...) took"""
+    with _phases_lock:
+        _phases.append({"phase": name, "seconds": round(seconds, 3)})
+
+
+@contextmanager
+def startup_phase(name: str):
+    """Time the wrapped block and record it as a startup phase"""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        record_startup_phase(name, time.monotonic() - start)
+
+
+def get_startup_report() -> Dict[str, Any]:
+    """Return all recorded phases and the time elapsed since the app package was imported"""
+    with _phases_lock:
+        phases = list(_phases)
+    return {
+        "since_import_seconds": round(time.monotonic() - _process_start, 3),
+        "phases": phases,
+    }
+
+
+def log_startup_report() -> None:
+    report = get_startup_report()
+    lines = [f"  {p['phase']:<32} {p['seconds']:>8.3f}s" for p in report["phases"]]
+    logging.info("Startup report (%.3fs since import):\n%s", report["since_import_seconds"], "\n".join(lines))
@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import deque
+from typing import Optional, Tuple, List, Any
+from app.core.sqlite_store import SQLiteConnections
+
+# (events after the requested id, generation finished, requested id already fell out of the ring)
+ReadResult = Tuple[List[Tuple[int, Any]], bool, bool]
+
+
+class MemoryStreamBuffer:
+    """
+    Per-generation ring buffer of stream events held in this process. Readers block on a
+    condition until new events arrive. A reconnecting client only finds its generation if
+    it reaches the same worker process; use SQLiteStreamBuffer with several workers.
+    """
+
+    def __init__(self, max_events: int = 2000, ttl: int = 600):
+        self.max_events = max_events
+        self.ttl = ttl
+        self._generations = {}
+        self._condition = threading.Condition()
+
+    def start(self, generation_id: str, owner_id: int) -> None:
+        with self._condition:
+            self._purge()
+            self._generations[generation_id] = {
+                "owner_id": owner_id, "events": deque(maxlen=self.max_events),
+                "next_id": 1, "finished": False, "cancelled": False, "updated_at": time.time()
+            }
+
+    def append(self, generation_id: str, payload: Any) -> int:
+        with self._condition:
+            generation = self._generations[generation_id]
+            event_id = generation["next_id"]
+            generation["events"].append((event_id, payload))
+            generation["next_id"] += 1
+            generation["updated_at"] = time.time()
+            self._condition.notify_all()
+            return event_id
+
+    def finish(self, generation_id: str) -> None:
+        with self._condition:
+            generation = self._generations.get(generation_id)
+            if generation:
+                generation["finished"] = True
+                generation["updated_at"] = time.time()
+            self._condition.notify_all()
+
+    def cancel(self, generation_id: str) -> None:
+        with self._condition:
+            generation = self._generations.get(generation_id)
+            if generation:
+                generation["cancelled"] = True
+
+    def is_cancelled(self, generation_id: str) -> bool:
+        with self._condition:
+            generation = self._generations.get(generation_id)
+            return bool(generation and generation["cancelled"])
+
+    def owner(self, generation_id: str) -> Optional[int]:
+        with self._condition:
+            generation = self._generations.get(generation_id)
+            return generation["owner_id"] if generation else None
+
+    def read(self, generation_id: str, after_id: int, timeout: float) -> Optional[ReadResult]:
+        """Wait up to `timeout` seconds for events newer than after_id; None if the generation is unknown"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                generation = self._generations.get(generation_id)
+                if generation is None:
+                    return None
+                events = [event for event in generation["events"] if event[0] > after_id]
+                remaining = deadline - time.monotonic()
+                if events or generation["finished"] or remaining <= 0:
+                    oldest = generation["events"][0][0] if generation["events"] else generation["next_id"]
+                    return events, generation["finished"], after_id < oldest - 1
+                self._condition.wait(remaining)
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.ttl
+        for generation_id in [g for g, gen in self._generations.items() if gen["updated_at"] < cutoff]:
+            del self._generations[generation_id]
+
+
+class SQLiteStreamBuffer:
+    """
+    Stream event ring buffer in a WAL-mode SQLite file, so a client can resume a
+    generation from any worker process on the host. Readers poll for new events.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, path: str, max_events: int = 2000, ttl: int = 600):
+        self.path = path
+        self.max_events = max_events
+        self.ttl = ttl
+        self._connections = SQLiteConnections(path)
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stream_generations ("
+                "generation_id TEXT PRIMARY KEY, owner_id INTEGER NOT NULL, "
+                "finished INTEGER NOT NULL DEFAULT 0, cancelled INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS stream_events ("
+                "generation_id TEXT NOT NULL, event_id INTEGER NOT NULL, payload TEXT NOT NULL, "
+                "PRIMARY KEY (generation_id, event_id))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def start(self, generation_id: str, owner_id: int) -> None:
+        now = time.time()
+        with self._connection() as conn:
+            expired = [row[0] for row in conn.execute(
+                "SELECT generation_id FROM stream_generations WHERE updated_at < ?", (now - self.ttl,)
+            )]
+            for expired_id in expired:
+                conn.execute("DELETE FROM stream_events WHERE generation_id = ?", (expired_id,))
+                conn.execute("DELETE FROM stream_generations WHERE generation_id = ?", (expired_id,))
+            conn.execute(
+                "INSERT OR REPLACE INTO stream_generations (generation_id, owner_id, finished, updated_at) VALUES (?, ?, 0, ?)",
+                (generation_id, owner_id, now)
+            )
+
+    def append(self, generation_id: str, payload: Any) -> int:
+        with self._connection() as conn:
+            event_id = conn.execute(
+                "SELECT COALESCE(MAX(event_id), 0) + 1 FROM stream_events WHERE generation_id = ?", (generation_id,)
+            ).fetchone()[0]
+            conn.execute(
+                "INSERT INTO stream_events (generation_id, event_id, payload) VALUES (?, ?, ?)",
+                (generation_id, event_id, json.dumps(payload))
+            )
+            conn.execute(
+                "DELETE FROM stream_events WHERE generation_id = ? AND event_id <= ?",
+                (generation_id, event_id - self.max_events)
+            )
+            conn.execute("UPDATE stream_generations SET updated_at = ? WHERE generation_id = ?", (time.time(), generation_id))
+        return event_id
+
+    def finish(self, generation_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE stream_generations SET finished = 1, updated_at = ? WHERE generation_id = ?",
+                (time.time(), generation_id)
+            )
+
+    def cancel(self, generation_id: str) -> None:
+        with self._connection() as conn:
+            conn.execute("UPDATE stream_generations SET cancelled = 1 WHERE generation_id = ?", (generation_id,))
+
+    def is_cancelled(self, generation_id: str) -> bool:
+        row = self._connection().execute(
+            "SELECT cancelled FROM stream_generations WHERE generation_id = ?", (generation_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def owner(self, generation_id: str) -> Optional[int]:
+        row = self._connection().execute(
+            "SELECT owner_id FROM stream_generations WHERE generation_id = ?", (generation_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def read(self, generation_id: str, after_id: int, timeout: float) -> Optional[ReadResult]:
+        """Poll up to `timeout` seconds for events newer than after_id; None if the generation is unknown"""
+        deadline = time.monotonic() + timeout
+        conn = self._connection()
+        while True:
+            generation = conn.execute(
+                "SELECT finished FROM stream_generations WHERE generation_id = ?", (generation_id,)
+            ).fetchone()
+            if generation is None:
+                return None
+            rows = conn.execute(
+                "SELECT event_id, payload FROM stream_events WHERE generation_id = ? AND event_id > ? ORDER BY event_id",
+                (generation_id, after_id)
+            ).fetchall()
+            if rows or generation[0] or time.monotonic() >= deadline:
+                oldest = conn.execute(
+                    "SELECT MIN(event_id) FROM stream_events WHERE generation_id = ?", (generation_id,)
+                ).fetchone()[0]
+                truncated = oldest is not None and after_id < oldest - 1
+                return [(row[0], json.loads(row[1])) for row in rows], bool(generation[0]), truncated
+            time.sleep(min(self.POLL_INTERVAL, max(0.0, deadline - time.monotonic())))
+
+
+_stream_buffer = None
+_stream_buffer_lock = threading.Lock()
+
+
+def get_stream_buffer():
+    """
+    Return the process-wide stream buffer selected by STREAM_BUFFER_BACKEND ("memory" or "sqlite").
+    Unset, it is "sqlite" when several gunicorn workers run (WEB_CONCURRENCY > 1), so a resumed
+    stream is found whichever worker the reconnect lands on.
+    """
+    global _stream_buffer
+    if _stream_buffer is None:
+        with _stream_buffer_lock:
+            if _stream_buffer is None:
+                max_events = int(os.environ.get('STREAM_BUFFER_MAX_EVENTS', 2000))
+                ttl = int(os.environ.get('STREAM_BUFFER_TTL', 600))
+                default_backend = 'sqlite' if int(os.environ.get('WEB_CONCURRENCY', 1)) > 1 else 'memory'
+                if os.environ.get('STREAM_BUFFER_BACKEND', default_backend).strip().lower() == 'sqlite':
+                    path = os.environ.get('STREAM_BUFFER_PATH', os.path.join('instance', 'streams.sqlite3'))
+                    _stream_buffer = SQLiteStreamBuffer(path, max_events=max_events, ttl=ttl)
+                else:
+                    _stream_buffer = MemoryStreamBuffer(max_events=max_events, ttl=ttl)
+    return _stream_buffer
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Any, List, Optional
+from app.core.sqlite_store import SQLiteConnections
+
+
+class LocalJobStore:
+    """
+    In-process job queue; jobs are lost if the process exits, and their status can only be
+    read from the process that queued them. Jobs sharing a serial_key run one at a time.
+    """
+
+    def __init__(self, max_finished: int = 1000):
+        self.max_finished = max_finished
+        self._pending: List[str] = []
+        self._running_keys = set()
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._condition = threading.Condition()
+
+    def put(self, job: Dict[str, Any]) -> None:
+        with self._condition:
+            self._jobs[job['id']] = job
+            self._pending.append(job['id'])
+            self._condition.notify()
+
+    def claim(self, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                job = self._claim_next()
+                remaining = deadline - time.monotonic()
+                if job or remaining <= 0:
+                    return job
+                self._condition.wait(remaining)
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        # Oldest pending job whose key has nothing running; later jobs of a busy key wait in order
+        for index, job_id in enumerate(self._pending):
+            job = self._jobs.get(job_id)
+            key = job.get('serial_key') if job else None
+            if key is not None and key in self._running_keys:
+                continue
+            del self._pending[index]
+            if job is None:
+                return None
+            if key is not None:
+                self._running_keys.add(key)
+            job['status'] = 'running'
+            return dict(job)
+        return None
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._condition:
+            job = self._jobs.get(job_id)
+            if job:
+                job.update(status=status, result=result, error=error, finished_at=time.time())
+                self._jobs.move_to_end(job_id)
+                if job.get('serial_key') is not None:
+                    self._running_keys.discard(job['serial_key'])
+                    self._condition.notify_all()
+            finished = [jid for jid, j in self._jobs.items() if j['status'] in ('done', 'failed')]
+            for jid in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._jobs[jid]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._condition:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+
+class SQLiteJobStore:
+    """
+    Persistent job queue in a local SQLite file. Jobs survive restarts and every
+    worker process on the host can claim jobs and report their status. A job is not
+    claimed while another job with the same serial_key is running in any process.
+    """
+
+    def __init__(self, path: str, stale_after: int = 600, keep_finished: int = 24 * 3600):
+        self.path = path
+        self.stale_after = stale_after
+        self.keep_finished = keep_finished
+        self._connections = SQLiteConnections(path, timeout=10, synchronous=None)
+        self._wakeup = threading.Event()
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, name TEXT NOT NULL, payload TEXT NOT NULL, "
+                "status TEXT NOT NULL, result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, claimed_at REAL, finished_at REAL, serial_key TEXT)"
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if 'serial_key' not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN serial_key TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_serial_key_status ON jobs (serial_key, status)")
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def put(self, job: Dict[str, Any]) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, name, payload, status, created_at, serial_key) VALUES (?, ?, ?, 'pending', ?, ?)",
+                (job['id'], job['name'], json.dumps(job['payload']), job['created_at'], job.get('serial_key'))
+            )
+        self._wakeup.set()
+
+    def claim(self, timeout: float) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self._claim_next()
+            if job or time.monotonic() >= deadline:
+                return job
+            # Woken immediately by local enqueues, otherwise poll for jobs from other processes
+            self._wakeup.wait(min(0.5, max(0.0, deadline - time.monotonic())))
+            self._wakeup.clear()
+
+    def _claim_next(self) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            # Requeue jobs whose worker died mid-run
+            conn.execute(
+                "UPDATE jobs SET status = 'pending' WHERE status = 'running' AND claimed_at < ?",
+                (now - self.stale_after,)
+            )
+            busy_key = (
+                "serial_key IS NOT NULL AND EXISTS (SELECT 1 FROM jobs AS running "
+                "WHERE running.serial_key = jobs.serial_key AND running.status = 'running')"
+            )
+            row = conn.execute(
+                f"SELECT id FROM jobs WHERE status = 'pending' AND NOT ({busy_key}) ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            # Re-checked in the UPDATE, which SQLite serializes, so two processes can't both start a key
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', claimed_at = ?, attempts = attempts + 1 "
+                f"WHERE id = ? AND status = 'pending' AND NOT ({busy_key})", (now, row[0])
+            ).rowcount
+        return self.get(row[0]) if claimed else None
+
+    def finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        now = time.time()
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, json.dumps(result), error, now, job_id)
+            )
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (now - self.keep_finished,)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT id, name, payload, status, result, error, created_at, serial_key FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "name": row[1],
+            "payload": json.loads(row[2]),
+            "status": row[3],
+            "result": json.loads(row[4]) if row[4] else None,
+            "error": row[5],
+            "created_at": row[6],
+            "serial_key": row[7],
+        }
+
+
+class TaskQueue:
+    """
+    Runs registered background jobs on a pool of worker threads inside an app context.
+    Configured from TASK_QUEUE_BACKEND ("local" or "sqlite"), TASK_QUEUE_PATH and TASK_QUEUE_WORKERS.
+    With several worker processes use "sqlite": local jobs can only be polled in the process
+    that queued them, and serial keys are only enforced within one process.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.store = None
+        self.num_workers = 2
+        self._handlers: Dict[str, Callable[..., Any]] = {}
+        self._workers_pid = None
+        self._workers_lock = threading.Lock()
+
+    def init_app(self, app) -> None:
+        self.app = app
+        self.num_workers = app.config.get('TASK_QUEUE_WORKERS', 2)
+        if app.config.get('TASK_QUEUE_BACKEND', 'local') == 'sqlite':
+            self.store = SQLiteJobStore(app.config.get('TASK_QUEUE_PATH', os.path.join('instance', 'tasks.sqlite3')))
+            # Pick up jobs persisted by a previous run once this process serves requests. Workers
+            # are never started by create_app() alone, so CLI commands and scripts that build the
+            # app don't claim jobs from the shared queue and then exit with them half-run.
+            app.before_request(self._ensure_workers)
+        else:
+            self.store = LocalJobStore()
+
+    def register(self, name: str, handler: Callable[..., Any]) -> None:
+        """Register the callable that runs jobs of the given name; it receives the payload as kwargs"""
+        self._handlers[name] = handler
+
+    def enqueue(self, name: str, serial_key: Optional[str] = None, **payload) -> Optional[str]:
+        """
+        Queue a job and return its id. Jobs with the same serial_key (e.g. one chat) run
+        one at a time in the order they were queued. Without an initialised app the job
+        runs inline so scripts and shells still work.
+        """
+        job = {"id": uuid.uuid4().hex, "name": name, "payload": payload, "status": "pending",
+               "result": None, "error": None, "created_at": time.time(), "serial_key": serial_key}
+        if self.store is None:
+            logging.warning(f"Task queue not initialised, running '{name}' inline")
+            self._handlers[name](**payload)
+            return None
+        self.store.put(job)
+        self._ensure_workers()
+        return job['id']
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self.store.get(job_id) if self.store else None
+
+    def _ensure_workers(self) -> None:
+        # Threads don't survive a fork, so workers are (re)started lazily in each process
+        if self._workers_pid == os.getpid():
+            return
+        with self._workers_lock:
+            if self._workers_pid == os.getpid():
+                return
+            for i in range(self.num_workers):
+                threading.Thread(target=self._work, name=f'task-worker-{i}', daemon=True).start()
+            self._workers_pid = os.getpid()
+
+    def _work(self) -> None:
+        while True:
+            try:
+                job = self.store.claim(timeout=5)
+            except Exception as e:
+                logging.error(f"Task queue claim failed: {e}", exc_info=True)
+                time.sleep(1)
+                continue
+            if job is None:
+                continue
+
+            handler = self._handlers.get(job['name'])
+            if handler is None:
+                self.store.finish(job['id'], 'failed', error=f"No handler registered for '{job['name']}'")
+                continue
+
+            start = time.monotonic()
+            with self.app.app_context():
+                try:
+                    result = handler(**job['payload'])
+                    self.store.finish(job['id'], 'done', result=result)
+                    logging.info(f"Job {job['name']} ({job['id']}) finished in {time.monotonic() - start:.2f}s")
+                except Exception as e:
+                    logging.error(f"Job {job['name']} ({job['id']}) failed: {e}", exc_info=True)
+                    self.store.finish(job['id'], 'failed', error=str(e))
@@ -0,0 +1,80 @@
+import os
+import time
+import threading
+from typing import Optional, Dict, Any
+from sqlalchemy.orm import make_transient_to_detached
+from app.core.extensions import db
+from app.models import User
+
+# Identity columns kept in the cache; the password hash is never cached
+_CACHED_COLUMNS = ('id', 'username', 'email', 'created_at', 'is_active')
+
+
+class UserCache:
+    """
+    Per-process TTL cache of user identity records for the Flask-Login user_loader.
+    Plain column values are cached rather than ORM instances, and a hit is attached to
+    the request's session with merge(load=False), so no SELECT is issued and the user can
+    still be modified and committed. Entries are dropped on profile update and logout;
+    changes made by other worker processes show up within `ttl` seconds.
+    """
+
+    def __init__(self, ttl: int = None, max_entries: int = 10000):
+        self.ttl = ttl if ttl is not None else int(os.environ.get('USER_CACHE_TTL', 60))
+        self.max_entries = max_entries
+        self._entries: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get_user(self, user_id: int) -> Optional[User]:
+        """Return the user for Flask-Login, from the cache when possible"""
+        if self.ttl > 0:
+            with self._lock:
+                entry = self._entries.get(user_id)
+                if entry is not None and entry[0] > time.monotonic():
+                    self.hits += 1
+                    values = entry[1]
+                else:
+                    self.misses += 1
+                    values = None
+            if values is not None:
+                user = User(**values)
+                make_transient_to_detached(user)
+                return db.session.merge(user, load=False)
+
+        user = db.session.get(User, user_id)
+        if user is not None and self.ttl > 0:
+            self._store(user)
+        return user
+
+    def _store(self, user: User) -> None:
+        values = {column: getattr(user, column) for column in _CACHED_COLUMNS}
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                for expired in [uid for uid, entry in self._entries.items() if entry[0] <= now]:
+                    del self._entries[expired]
+                if len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+            self._entries[user.id] = (time.monotonic() + self.ttl, values)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+user_cache = UserCache()
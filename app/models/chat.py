@@ -15,6 +15,9 @@ class Chat(db.Model):
     # One-to-one relationship with ChatSummary
     summary = db.relationship('ChatSummary', backref='chat', uselist=False, lazy=True, cascade='all, delete-orphan')
 
+    # Serves the per-user chat list ordered by most recent activity
+    __table_args__ = (db.Index('ix_chat_user_updated', 'user_id', 'updated_at', 'id'),)
+
     def __repr__(self):
         return f'<Chat {self.id}>'
 
@@ -26,6 +29,9 @@ class Message(db.Model):
     content_type = db.Column(db.String(20), default='text')  
     file_path = db.Column(db.String(500)) 
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    # Serves recent-history and full-history reads of a chat in either direction
+    __table_args__ = (db.Index('ix_message_chat_created', 'chat_id', 'created_at', 'id'),)
     
     def __repr__(self):
         return f'<Message {self.id}>'
@@ -25,8 +25,17 @@ class UserMemory(db.Model):
     last_accessed_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc)) # Add this line
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    embedding = db.Column(db.LargeBinary, nullable=True) # float32 sentence embedding of content
 
-    __table_args__ = (db.UniqueConstraint('user_id', 'content', name='_user_content_uc'),) # Add this line
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'content', name='_user_content_uc'),
+        # Prompt-time retrieval: active, verified memories by importance
+        db.Index('ix_user_memories_relevance', 'user_id', 'is_active', 'is_verified', 'importance_score', 'last_accessed_at'),
+        # Dashboard listings: all memories by recency, or one category by importance
+        # (id is the keyset pagination tie-break, so cursor pages are served from the index too)
+        db.Index('ix_user_memories_recent', 'user_id', 'is_active', 'last_accessed_at', 'id'),
+        db.Index('ix_user_memories_category', 'user_id', 'category_id', 'is_active', 'importance_score', 'last_accessed_at', 'id'),
+    )
 class ChatSummary(db.Model):
     __tablename__ = 'chat_summaries'
     id = db.Column(db.Integer, primary_key=True)
@@ -36,10 +45,12 @@ class ChatSummary(db.Model):
     key_topics = db.Column(db.JSON)
     extracted_facts = db.Column(db.JSON)
     summary_version = db.Column(db.Integer, default=1, nullable=False)
+    # Newest message folded into the summary; later messages are still un-summarized
+    last_summarized_message_id = db.Column(db.Integer, nullable=True)
 
 class MemorySource(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    memory_id = db.Column(db.Integer, db.ForeignKey('user_memory.id'), nullable=False)
+    memory_id = db.Column(db.Integer, db.ForeignKey('user_memories.id'), nullable=False, index=True)
     chat_id = db.Column(db.Integer, db.ForeignKey('chat.id'), nullable=True)
     message_id = db.Column(db.Integer, db.ForeignKey('message.id'), nullable=True)
     source_type = db.Column(db.String(50)) # e.g., 'chat', 'manual'
\ No newline at end of file
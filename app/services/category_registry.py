@@ -0,0 +1,68 @@
+import os
+import time
+import hashlib
+import threading
+from typing import Dict, Any, List, NamedTuple
+from app.models import MemoryCategory
+
+
+class CategorySnapshot(NamedTuple):
+    categories: List[Dict[str, Any]]  # active categories, ordered by name, as served by the API
+    ids_by_name: Dict[str, int]
+    names_by_id: Dict[int, str]
+    prompt_text: str  # "- name: description" lines for categorization prompts
+    etag: str
+
+
+class MemoryCategoryRegistry:
+    """
+    Per-process snapshot of the memory categories. The table is small and changes only when it
+    is seeded, so it is loaded once and reused by the memory API, fact categorization and the
+    post-turn analysis prompt. The snapshot is reloaded after `ttl` seconds or an explicit
+    invalidate() in this process; its etag is a hash of the category rows, so clients can
+    revalidate cheaply. An empty table (not seeded yet) is only cached for EMPTY_TTL seconds.
+    """
+
+    EMPTY_TTL = 5
+
+    def __init__(self, ttl: int = None):
+        self.ttl = ttl if ttl is not None else int(os.environ.get('MEMORY_CATEGORY_TTL', 300))
+        self._snapshot = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self.loads = 0
+
+    def get(self) -> CategorySnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() < self._expires_at:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or time.monotonic() >= self._expires_at:
+                self._snapshot = self._load()
+                ttl = self.ttl if self._snapshot.names_by_id else min(self.ttl, self.EMPTY_TTL)
+                self._expires_at = time.monotonic() + ttl
+                self.loads += 1
+            return self._snapshot
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+    @staticmethod
+    def _load() -> CategorySnapshot:
+        rows = MemoryCategory.query.order_by(MemoryCategory.name).all()
+        fingerprint = hashlib.sha256(
+            repr([(cat.id, cat.name, cat.description, cat.is_active) for cat in rows]).encode('utf-8')
+        ).hexdigest()[:16]
+        return CategorySnapshot(
+            categories=[{"id": cat.id, "name": cat.name, "description": cat.description}
+                        for cat in rows if cat.is_active],
+            # Lookups cover every row, as categorization and stored memories always have
+            ids_by_name={cat.name: cat.id for cat in rows},
+            names_by_id={cat.id: cat.name for cat in rows},
+            prompt_text="\n".join(f"- {cat.name}: {cat.description}" for cat in rows),
+            etag=fingerprint
+        )
+
+
+category_registry = MemoryCategoryRegistry()
@@ -1,42 +1,51 @@
 import os
 import logging
 import re
-import json
 from typing import Generator
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
-from app.core.extensions import db
+from app.core.extensions import db, task_queue
 from app.models import Chat, Message, ChatSummary
 from flask_login import current_user
 from app.services.rag_service import RAGService
 from .memory_service import UserMemoryService, MemoryExtractionService
+from .llm_clients import get_chat_model, get_cached_chat_model
+from .context_builder import ContextBuilder, count_tokens, truncate_to_tokens
+from .llm_json import StreamingJSONParser, parse_json_response
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Rolling summary: re-summarize every N turns or once this many un-summarized tokens pile up
+SUMMARY_EVERY_N_TURNS = int(os.environ.get('SUMMARY_EVERY_N_TURNS', 4))
+SUMMARY_TOKEN_THRESHOLD = int(os.environ.get('SUMMARY_TOKEN_THRESHOLD', 1500))
+# Past this size the accumulated segment summaries are compacted into one
+SUMMARY_MAX_TOKENS = int(os.environ.get('SUMMARY_MAX_TOKENS', 800))
+SUMMARY_MESSAGE_TOKENS = 500
+SOURCE_TAG_PATTERN = re.compile(r'\[/?s:\d+\]')
+
 class ChatService:
     def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=os.environ.get("GOOGLE_API_KEY"),
-            temperature=0.7
-        )
-        self.utility_llm = ChatGoogleGenerativeAI(
-            model="gemini-2.0-flash",
-            google_api_key=os.environ.get("GOOGLE_API_KEY"),
-            temperature=0.3
-        )
-        # Instantiate services
+        # Instantiate services; the LLM clients and the embedder are created lazily on first use
         self.user_memory_service = UserMemoryService()
-        self.memory_extractor = MemoryExtractionService(llm=self.utility_llm)
+        self.memory_extractor = MemoryExtractionService()
         self.rag_service = RAGService() # Initialize RAGService
+        task_queue.register('chat.post_turn', self._run_post_turn)
+
+    @property
+    def llm(self):
+        return get_chat_model(temperature=0.7)
+
+    @property
+    def utility_llm(self):
+        # Identical utility prompts (e.g. titles for "hello") are answered from the response cache
+        return get_cached_chat_model(temperature=0.3)
 
-    def _get_or_create_chat(self, chat_id: int = None):
+    def _get_or_create_chat(self, user_id: int, chat_id: int = None):
         chat = None
         if chat_id:
-            chat = Chat.query.filter_by(id=chat_id, user_id=current_user.id).first()
+            chat = Chat.query.filter_by(id=chat_id, user_id=user_id).first()
 
         if not chat:
-            chat = Chat(user_id=current_user.id, title="New Chat")
+            chat = Chat(user_id=user_id, title="New Chat")
             db.session.add(chat)
             chat.summary = ChatSummary(
                 short_summary="Chat just started.",
@@ -50,18 +59,21 @@ class ChatService:
 
     def get_response(self, query: str, chat_id: int = None, use_rag: bool = False, is_research_mode: bool = False) -> Generator[dict, None, None]:
         full_bot_response = ""
-        new_title_generated = None
+        post_turn_job = None
         sources_for_response = None
         try:
             if not query or not query.strip():
                 yield {"type": "error", "message": "Query cannot be empty"}
                 return
                 
-            chat = self._get_or_create_chat(chat_id)
+            # Resolve the current_user proxy once for the whole response
+            user_id = current_user.id
+            chat = self._get_or_create_chat(user_id, chat_id)
             yield {"type": "chat_info", "chat_id": chat.id}
 
-            messages = []
-            
+            # Sections are filled by priority under CONTEXT_TOKEN_BUDGET; lower numbers win
+            context = ContextBuilder()
+
             if is_research_mode:
                 yield {"type": "status", "message": "Performing research..."}
                 rag_data = self.rag_service.get_context(query)
@@ -91,15 +103,15 @@ You MUST wrap every piece of information you provide with special tags indicatin
 
 Based on this material, answer the user's query using the specified tagging format.
 """
-                messages.append(SystemMessage(content=research_prompt))
+                context.add("system", [SystemMessage(content=research_prompt)], priority=0, required=True)
             
             else:
-                messages.append(SystemMessage(content="You are a helpful AI assistant. Be conversational and provide detailed, helpful responses."))
+                context.add("system", [SystemMessage(content="You are a helpful AI assistant. Be conversational and provide detailed, helpful responses.")], priority=0, required=True)
                 
-                relevant_memories = self.user_memory_service.get_relevant_memories(user_id=current_user.id)
+                relevant_memories = self.user_memory_service.get_relevant_memories(user_id=user_id, query=query)
                 if relevant_memories:
                     memory_context = "\n".join([f"- {mem.content}" for mem in relevant_memories])
-                    messages.append(SystemMessage(content=f"To personalize your response, remember these key facts about the user:\n{memory_context}"))
+                    context.add("memories", [SystemMessage(content=f"To personalize your response, remember these key facts about the user:\n{memory_context}")], priority=2)
 
                 if use_rag:
                     yield {"type": "status", "message": "Searching the web..."}
@@ -107,18 +119,22 @@ Based on this material, answer the user's query using the specified tagging form
                     rag_context = rag_data.get("context")
                     sources_for_response = rag_data.get("sources") # Also get sources for regular RAG
                     if rag_context:
-                        messages.append(SystemMessage(content=f"Here is some information from a web search to help you answer the user's query:\n{rag_context}"))
+                        context.add("web", [SystemMessage(content=f"Here is some information from a web search to help you answer the user's query:\n{rag_context}")], priority=1)
                 
                 if chat.summary and chat.summary.detailed_summary and chat.summary.detailed_summary != "This is the beginning of a new conversation.":
-                    messages.append(SystemMessage(content=f"Here is a summary of the current conversation so far: {chat.summary.detailed_summary}"))
+                    context.add("summary", [SystemMessage(content=f"Here is a summary of the current conversation so far: {chat.summary.detailed_summary}")], priority=3)
 
                 recent_messages = Message.query.filter_by(chat_id=chat.id).order_by(Message.created_at.desc()).limit(10).all()
                 recent_messages.reverse() 
+                history = []
                 for msg in recent_messages:
-                    if msg.role == 'user': messages.append(HumanMessage(content=msg.content))
-                    elif msg.role == 'assistant': messages.append(AIMessage(content=msg.content))
+                    if msg.role == 'user': history.append(HumanMessage(content=msg.content))
+                    elif msg.role == 'assistant': history.append(AIMessage(content=msg.content))
+                # Oldest turns are dropped first once the budget runs out
+                context.add("history", history, priority=4, newest_first=True, cap_messages=True)
 
-            messages.append(HumanMessage(content=query.strip()))
+            context.add("query", [HumanMessage(content=query.strip())], priority=0, required=True)
+            messages, _ = context.build()
             
             yield {"type": "status", "message": "Generating response..."}
             for chunk in self.llm.stream(messages):
@@ -129,13 +145,21 @@ Based on this material, answer the user's query using the specified tagging form
 
             if full_bot_response.strip():
                 is_new_chat = not chat.title or chat.title == "New Chat"
-                self._save_chat_turn(chat, query, full_bot_response)
-                
-                if is_new_chat:
-                    new_title_generated = self._generate_title_for_chat(chat, query, full_bot_response)
-                
-                if not is_research_mode:
-                    self.memory_extractor.extract_memories_from_chat(chat)
+                last_message_id = self._save_chat_turn(chat, query, full_bot_response)
+
+                # Summary, title and memory extraction run after the stream has closed
+                job_id = task_queue.enqueue(
+                    'chat.post_turn',
+                    serial_key=f"chat:{chat.id}",  # turns of one chat update the same summary
+                    chat_id=chat.id,
+                    user_id=chat.user_id,
+                    user_message=query,
+                    bot_response=full_bot_response,
+                    last_message_id=last_message_id,
+                    generate_title=is_new_chat,
+                    extract_memories=not is_research_mode
+                )
+                post_turn_job = {"type": "post_processing", "job_id": job_id, "chat_id": chat.id, "title_pending": is_new_chat}
             else:
                 yield {"type": "error", "message": "No response generated"}
 
@@ -145,8 +169,8 @@ Based on this material, answer the user's query using the specified tagging form
         finally:
             if sources_for_response:
                 yield {"type": "sources", "data": sources_for_response}
-            if new_title_generated:
-                yield {"type": "title_update", "chat_id": chat.id, "title": new_title_generated}
+            if post_turn_job:
+                yield post_turn_job
 
     def _generate_title_for_chat(self, chat: Chat, user_message: str, bot_response: str) -> str:
         try:
@@ -167,82 +191,249 @@ Based on this material, answer the user's query using the specified tagging form
             db.session.rollback()
         return None
 
-    def _update_chat_summary(self, chat: Chat, user_message: str, bot_response: str):
+    def _pending_summary(self, chat: Chat, last_message_id: int = None):
+        """
+        Return (pending messages, their transcript lines, whether the summary is due).
+        The summary is due every SUMMARY_EVERY_N_TURNS turns or once un-summarized
+        history exceeds SUMMARY_TOKEN_THRESHOLD. With last_message_id, messages saved
+        after it (later turns whose jobs are still queued) are left for those jobs.
+        """
+        if not chat.summary:
+            chat.summary = ChatSummary(chat_id=chat.id)
+        summary = chat.summary
+
+        pending = Message.query.filter(Message.chat_id == chat.id)
+        if last_message_id:
+            pending = pending.filter(Message.id <= last_message_id)
+        first_window = summary.last_summarized_message_id is None
+        if first_window:
+            # Chats that were never summarized incrementally may hold long histories: only the
+            # latest turns are summarized and everything before them counts as covered
+            # (summaries written before incremental mode already cover all but the latest turn)
+            window = 2 if (summary.summary_version or 1) > 1 else 2 * SUMMARY_EVERY_N_TURNS
+            pending = pending.order_by(Message.id.desc()).limit(window).all()[::-1]
+        else:
+            pending = pending.filter(Message.id > summary.last_summarized_message_id).order_by(Message.id).all()
+        if not pending:
+            return [], [], False
+
+        transcript = [self._transcript_line(msg.role, msg.content) for msg in pending]
+        pending_tokens = sum(count_tokens(line) for line in transcript)
+        trimmed = False
+        while first_window and pending_tokens > SUMMARY_TOKEN_THRESHOLD and len(pending) > 2:
+            pending_tokens -= count_tokens(transcript[0])
+            pending, transcript, trimmed = pending[1:], transcript[1:], True
+        turns = sum(1 for msg in pending if msg.role == 'user')
+        # A trimmed first window is full, so summarize it now rather than let it slide further
+        return pending, transcript, trimmed or turns >= SUMMARY_EVERY_N_TURNS or pending_tokens >= SUMMARY_TOKEN_THRESHOLD
+
+    @staticmethod
+    def _transcript_line(role: str, content: str) -> str:
+        # Research answers are summarized without their inline source tags
+        text = truncate_to_tokens(SOURCE_TAG_PATTERN.sub('', content), SUMMARY_MESSAGE_TOKENS)
+        return f"{'User' if role == 'user' else 'Assistant'}: {text}"
+
+    def _apply_summary(self, chat: Chat, pending: list, summary_data: dict):
+        """Append the segment summary, compacting when it grows too long, and advance the summary marker"""
+        summary = chat.summary
+        segment = str(summary_data.get("segment_summary") or "").strip()
+        detailed = summary.detailed_summary
+        if not detailed or detailed == "This is the beginning of a new conversation.":
+            detailed = segment
+        elif segment:
+            detailed = f"{detailed}\n\n{segment}"
+        if count_tokens(detailed) > SUMMARY_MAX_TOKENS:
+            detailed = self._compact_summary(detailed)
+
+        summary.short_summary = summary_data.get("short_summary") or summary.short_summary
+        summary.detailed_summary = detailed
+        summary.key_topics = summary_data.get("key_topics", summary.key_topics)
+        summary.extracted_facts = summary_data.get("extracted_facts", summary.extracted_facts)
+        summary.last_summarized_message_id = pending[-1].id
+        summary.summary_version = (summary.summary_version or 0) + 1
+
+    def _update_chat_summary(self, chat: Chat, last_message_id: int = None) -> bool:
+        """
+        Fold messages newer than the summary into it, sending only the new messages
+        plus the short summary. Used when the combined post-turn analysis fails.
+        Returns True only when a new summary (and new extracted_facts) was saved.
+        """
         try:
-            # We don't need to summarize research mode chats in the same way
-            if '[s:' in bot_response:
-                return
+            pending, transcript, due = self._pending_summary(chat, last_message_id)
+            if not due:
+                return False
 
+            new_messages = "\n".join(transcript)
             summary_prompt = f"""
-            Given the previous conversation summary and the latest interaction, please provide an updated, layered summary in JSON format.
+            You are maintaining a running summary of a conversation. Summarize ONLY the new messages below; the earlier part of the conversation is already summarized.
 
-            Previous Detailed Summary:
-            "{chat.summary.detailed_summary if chat.summary else 'None'}"
+            Conversation so far (one sentence):
+            "{chat.summary.short_summary or 'The conversation just started.'}"
 
-            Latest Interaction:
-            User: "{user_message}"
-            Assistant: "{bot_response}"
+            New Messages:
+            {new_messages}
 
             Respond ONLY with a valid JSON object containing these keys. Do not include any other text or markdown formatting.
             - "short_summary": A new, one-sentence summary of the entire conversation so far.
-            - "detailed_summary": An updated, comprehensive summary of the entire conversation.
-            - "key_topics": An array of 1-3 word strings representing the main topics of the latest interaction.
-            - "extracted_facts": An array of strings, where each string is a potential long-term memory fact about the user (e.g., "User's favorite color is blue", "User is a software engineer"). Extract only from the latest interaction.
+            - "segment_summary": A concise summary of the new messages only.
+            - "key_topics": An array of 1-3 word strings representing the main topics of the new messages.
+            - "extracted_facts": An array of strings, where each string is a potential long-term memory fact about the user (e.g., "User's favorite color is blue", "User is a software engineer"). Extract only from the new messages.
 
             JSON Response:
             """
             response = self.utility_llm.invoke([HumanMessage(content=summary_prompt)])
-            
-            raw_content = response.content
-            summary_data = None
-
-            try:
-                start_index = raw_content.find('{')
-                end_index = raw_content.rfind('}')
-                
-                if start_index != -1 and end_index != -1:
-                    json_str = raw_content[start_index:end_index+1]
-                    summary_data = json.loads(json_str)
-                else:
-                    logging.warning(f"No JSON object found in the LLM summary response. Raw content: '{raw_content}'")
-                    return
+            summary_data = parse_json_response(response.content)
+            if not isinstance(summary_data, dict):
+                logging.warning(f"No JSON object found in the LLM summary response. Raw content: '{response.content}'")
+                return False
 
-            except json.JSONDecodeError as e:
-                logging.error(f"Failed to parse JSON from LLM summary response. Error: {e}")
-                logging.error(f"Raw LLM content was: '{raw_content}'")
-                return 
-
-            if not summary_data:
-                logging.warning("Could not extract summary data from LLM response.")
-                return
-
-            if not chat.summary:
-                chat.summary = ChatSummary(chat_id=chat.id)
-            
-            chat.summary.short_summary = summary_data.get("short_summary", chat.summary.short_summary)
-            chat.summary.detailed_summary = summary_data.get("detailed_summary", chat.summary.detailed_summary)
-            chat.summary.key_topics = summary_data.get("key_topics", chat.summary.key_topics)
-            chat.summary.extracted_facts = summary_data.get("extracted_facts", chat.summary.extracted_facts)
-            chat.summary.summary_version += 1
-            
+            self._apply_summary(chat, pending, summary_data)
             db.session.commit()
+            return True
 
         except Exception as e:
             logging.error(f"An unexpected error occurred during chat summary update: {e}", exc_info=True)
             db.session.rollback()
+            return False
+
+    def _analyze_turn(self, chat: Chat, user_message: str, bot_response: str,
+                      generate_title: bool, extract_memories: bool, last_message_id: int = None):
+        """
+        Produce the title, summary update and categorized memory facts of a turn in a
+        single utility LLM call, asking only for the parts that are needed.
+        Returns {"title": ...}, or None if the response could not be used.
+        """
+        # Bounded by this turn's reply, the last two pending messages are this turn
+        pending, transcript, summary_due = self._pending_summary(chat, last_message_id)
+        if not (generate_title or summary_due or extract_memories):
+            return {"title": None}
+
+        sections = []
+        keys = []
+        if summary_due and len(transcript) > 2:
+            earlier = "\n".join(transcript[:-2])
+            sections.append(f"Earlier New Messages (not yet summarized):\n{earlier}")
+        latest = "\n".join([self._transcript_line('user', user_message), self._transcript_line('assistant', bot_response)])
+        sections.append(f"Latest Exchange:\n{latest}")
+
+        if generate_title:
+            keys.append('- "title": A very short, concise title for the conversation (4-5 words max).')
+        if summary_due:
+            sections.insert(0, f'Conversation so far (one sentence):\n"{chat.summary.short_summary or "The conversation just started."}"')
+            keys.append('- "short_summary": A new, one-sentence summary of the entire conversation so far.')
+            keys.append('- "segment_summary": A concise summary of the new messages and the latest exchange only.')
+            keys.append('- "key_topics": An array of 1-3 word strings representing the main topics of those messages.')
+        if extract_memories:
+            category_map, category_prompt_list = self.memory_extractor.get_category_prompt()
+            sections.append(f"Memory Categories:\n{category_prompt_list}")
+            keys.append('- "facts": An array of objects with the keys "fact" (a long-term memory fact about the user, e.g. "User is a software engineer") '
+                        'and "category" (a category name exactly as written above). Extract only from the latest exchange; use [] if there are none.')
+
+        body = "\n\n".join(sections)
+        key_list = "\n".join(keys)
+        prompt = f"""
+        Analyze the following conversation turn.
+
+        {body}
+
+        Respond ONLY with a valid JSON object containing these keys. Do not include any other text or markdown formatting.
+        {key_list}
+
+        JSON Response:
+        """
+        try:
+            parser = StreamingJSONParser()
+            # The prompt carries this turn's messages, so it would never be served from the cache
+            for chunk in self.utility_llm.stream([HumanMessage(content=prompt)], use_cache=False):
+                if isinstance(chunk.content, str) and parser.feed(chunk.content) is not None:
+                    break
+            data = parser.close()
+        except Exception as e:
+            logging.error(f"Post-turn analysis call failed for chat {chat.id}: {e}", exc_info=True)
+            return None
+        if not isinstance(data, dict):
+            logging.warning(f"No JSON object found in the post-turn analysis for chat {chat.id}.")
+            return None
+
+        title = None
+        try:
+            if generate_title:
+                title = re.sub(r'["\']', '', str(data.get("title") or "")).strip()[:200] or None
+                if title:
+                    chat.title = title
+            if summary_due and data.get("segment_summary"):
+                self._apply_summary(chat, pending, data)
+            db.session.commit()
+        except Exception as e:
+            logging.error(f"Error saving post-turn analysis for chat {chat.id}: {e}", exc_info=True)
+            db.session.rollback()
+            return None
+
+        if extract_memories:
+            if parser.repaired:
+                # A cut-off response may end in a half-written fact
+                logging.warning(f"Post-turn analysis for chat {chat.id} was truncated; skipping memory facts.")
+            else:
+                self.memory_extractor.save_categorized_facts(chat, data.get("facts"))
+        return {"title": title}
+
+    def _compact_summary(self, detailed_summary: str) -> str:
+        """Condense the accumulated segment summaries into one shorter summary"""
+        prompt = f"""
+        The following is a conversation summary built up from several partial summaries, oldest first.
+        Rewrite it as a single summary of at most {SUMMARY_MAX_TOKENS // 2} words. Keep names, decisions, open questions and anything the user asked to remember; drop repetition.
+        Respond with the summary text only.
+
+        Summary:
+        {detailed_summary}
+        """
+        response = self.utility_llm.invoke([HumanMessage(content=prompt)])
+        compacted = (response.content or "").strip()
+        return compacted or detailed_summary
 
     def _save_chat_turn(self, chat: Chat, user_message: str, bot_response: str):
+        """Save a turn's two messages; returns the reply's message id, or None on failure"""
         try:
             user_msg = Message(chat_id=chat.id, role='user', content=user_message)
             bot_msg = Message(chat_id=chat.id, role='assistant', content=bot_response)
             db.session.add_all([user_msg, bot_msg])
             db.session.commit()
-
-            self._update_chat_summary(chat, user_message, bot_response)
-            
+            return bot_msg.id
         except Exception as e:
             logging.error(f"Error saving chat turn: {e}", exc_info=True)
             db.session.rollback()
+            return None
+
+    def _run_post_turn(self, chat_id: int, user_id: int, user_message: str, bot_response: str,
+                       generate_title: bool = False, extract_memories: bool = True,
+                       last_message_id: int = None) -> dict:
+        """
+        Background job run after a response has been streamed: updates the summary,
+        names new chats and extracts long-term memories, all in one LLM call when possible.
+        The summary only covers messages up to last_message_id (this turn's reply), so a
+        later turn saved before this job ran is summarized by its own job.
+        """
+        chat = Chat.query.filter_by(id=chat_id, user_id=user_id).first()
+        if not chat:
+            return {"title": None}
+
+        result = self._analyze_turn(chat, user_message, bot_response, generate_title, extract_memories, last_message_id)
+        if result is not None:
+            return result
+
+        # Fall back to one call per task when the combined response is unusable
+        logging.warning(f"Falling back to separate post-turn calls for chat {chat_id}.")
+        summarized = self._update_chat_summary(chat, last_message_id)
+
+        title = None
+        if generate_title:
+            title = self._generate_title_for_chat(chat, user_message, bot_response)
+
+        # Facts only exist for the messages just summarized; older ones were already handled
+        if extract_memories and summarized:
+            self.memory_extractor.extract_memories_from_chat(chat)
+
+        return {"title": title}
 
     def process_file_content(self, file_content: str, file_type: str) -> str:
         if file_type in ['py', 'js', 'html', 'css', 'java', 'cpp', 'c']:
@@ -0,0 +1,98 @@
+import os
+import logging
+from typing import List, Dict, Any, Tuple
+from langchain_core.messages import BaseMessage
+
+_encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count tokens with tiktoken when it is installed, otherwise approximate them
+    (about 4 characters per token for English text and code).
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding('cl100k_base')
+        except ImportError:
+            _encoding = False
+    if _encoding:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, (len(text) + 3) // 4) if text else 0
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Shorten text to roughly max_tokens, keeping its beginning and end"""
+    if count_tokens(text) <= max_tokens:
+        return text
+    max_chars = max_tokens * 4
+    head = text[:max_chars * 2 // 3]
+    tail = text[-(max_chars // 3):]
+    return f"{head}\n[... truncated ...]\n{tail}"
+
+
+class ContextBuilder:
+    """
+    Assembles prompt messages section by section under a token budget.
+    Sections are filled in priority order (lower first) but emitted in the order they were added.
+    """
+
+    def __init__(self, budget: int = None, max_message_tokens: int = None, min_truncated_tokens: int = 64):
+        self.budget = budget or int(os.environ.get('CONTEXT_TOKEN_BUDGET', 8000))
+        self.max_message_tokens = max_message_tokens or int(os.environ.get('CONTEXT_MAX_MESSAGE_TOKENS', 1000))
+        self.min_truncated_tokens = min_truncated_tokens
+        self._sections: List[Dict[str, Any]] = []
+
+    def add(self, name: str, messages: List[BaseMessage], priority: int, required: bool = False,
+            newest_first: bool = False, cap_messages: bool = False) -> None:
+        """
+        Add a section of messages.
+        Args:
+            priority: lower numbers are filled first
+            required: always included, even when it exceeds the remaining budget
+            newest_first: fill from the last message backwards (for chat history)
+            cap_messages: truncate each message to max_message_tokens before fitting it
+        """
+        self._sections.append({
+            "name": name, "messages": messages, "priority": priority,
+            "required": required, "newest_first": newest_first,
+            "cap_messages": cap_messages
+        })
+
+    def build(self) -> Tuple[List[BaseMessage], Dict[str, int]]:
+        """Return the messages that fit the budget and the token count of each section"""
+        remaining = self.budget
+        kept: Dict[int, List[BaseMessage]] = {}
+        report: Dict[str, int] = {}
+
+        for index, section in sorted(enumerate(self._sections), key=lambda item: item[1]["priority"]):
+            selected = []
+            used = 0
+            messages = list(reversed(section["messages"])) if section["newest_first"] else section["messages"]
+            for message in messages:
+                content = message.content if isinstance(message.content, str) else str(message.content)
+                if section["cap_messages"] and count_tokens(content) > self.max_message_tokens:
+                    content = truncate_to_tokens(content, self.max_message_tokens)
+                tokens = count_tokens(content)
+
+                if not section["required"] and tokens > remaining - used:
+                    available = remaining - used
+                    if available < self.min_truncated_tokens:
+                        break
+                    content = truncate_to_tokens(content, available)
+                    tokens = count_tokens(content)
+                selected.append(message if content == message.content else message.__class__(content=content))
+                used += tokens
+
+            if section["newest_first"]:
+                selected.reverse()
+            kept[index] = selected
+            report[section["name"]] = report.get(section["name"], 0) + used
+            remaining -= used
+
+        report["total"] = self.budget - remaining
+        messages = [message for index in range(len(self._sections)) for message in kept.get(index, [])]
+        logging.info("Prompt tokens by section: " + ", ".join(f"{name}={tokens}" for name, tokens in report.items()))
+        return messages, report
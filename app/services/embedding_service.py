@@ -0,0 +1,242 @@
+import os
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+import numpy as np
+from app.core.startup import record_startup_phase
+from app.core.sqlite_store import SQLiteConnections
+
+EMBEDDING_MODEL_NAME = os.environ.get('EMBEDDING_MODEL', 'all-MiniLM-L6-v2')
+
+_embedder = None
+_embedder_lock = threading.Lock()
+
+
+def get_embedder():
+    """
+    Return the process-wide SentenceTransformer, loading it on first use.
+    torch and the model weights are only imported when something actually needs embeddings.
+    """
+    global _embedder
+    if _embedder is None:
+        with _embedder_lock:
+            if _embedder is None:
+                start = time.monotonic()
+                from sentence_transformers import SentenceTransformer
+                # Suppress noisy logs from the sentence-transformers library
+                logging.getLogger("sentence_transformers").setLevel(logging.WARNING)
+                _embedder = SentenceTransformer(EMBEDDING_MODEL_NAME)
+                record_startup_phase(f"load embedder ({EMBEDDING_MODEL_NAME})", time.monotonic() - start)
+    return _embedder
+
+
+def warm_up_embedder(background: bool = True) -> None:
+    """Load the embedder ahead of the first request, optionally on a daemon thread"""
+    if background:
+        threading.Thread(target=get_embedder, name='embedder-warmup', daemon=True).start()
+    else:
+        get_embedder()
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only on-disk embedding store: vectors live in a raw float32 file that is
+    read through a NumPy memmap, with a SQLite index mapping content hash to row.
+    """
+
+    def __init__(self, directory: str, max_rows: int = 500000):
+        self.directory = directory
+        self.max_rows = max_rows
+        self.vectors_path = os.path.join(directory, 'vectors.f32')
+        self.index_path = os.path.join(directory, 'index.sqlite3')
+        # Autocommit mode so writers can take an explicit BEGIN IMMEDIATE lock across processes
+        self._connections = SQLiteConnections(self.index_path, timeout=10, synchronous=None, isolation_level=None)
+        self._map_lock = threading.Lock()
+        self._memmap = None
+        self._dim = None
+
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            row = conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+            if row:
+                self._dim = int(row[0])
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _vectors(self, min_rows: int) -> Optional[np.ndarray]:
+        """Return a memmap covering at least min_rows rows, remapping if the file has grown"""
+        with self._map_lock:
+            if self._memmap is None or self._memmap.shape[0] < min_rows:
+                if not self._dim or not os.path.exists(self.vectors_path):
+                    return None
+                rows = os.path.getsize(self.vectors_path) // (self._dim * 4)
+                if rows < min_rows:
+                    return None
+                self._memmap = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, self._dim))
+            return self._memmap
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        if not keys or not self._dim:
+            return {}
+        found = {}
+        conn = self._connection()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ','.join('?' * len(chunk))
+            found.update(conn.execute(f"SELECT key, row FROM vectors WHERE key IN ({placeholders})", chunk).fetchall())
+        if not found:
+            return {}
+        vectors = self._vectors(max(found.values()) + 1)
+        if vectors is None:
+            return {}
+        return {key: np.array(vectors[row]) for key, row in found.items()}
+
+    def put_many(self, keys: List[str], vectors: np.ndarray) -> None:
+        if not keys:
+            return
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._dim is None:
+                row = conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+                self._dim = int(row[0]) if row else vectors.shape[1]
+                conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('dim', ?)", (str(self._dim),))
+            next_row = conn.execute("SELECT COALESCE(MAX(row) + 1, 0) FROM vectors").fetchone()[0]
+            existing = set()
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                existing.update(k for k, in conn.execute(f"SELECT key FROM vectors WHERE key IN ({placeholders})", chunk))
+            pending = [(k, v) for k, v in zip(keys, vectors) if k not in existing]
+            if not pending or next_row + len(pending) > self.max_rows:
+                conn.execute("ROLLBACK")
+                return
+            # Vectors are written before the index rows commit, so readers never see an unwritten row
+            with open(self.vectors_path, 'r+b' if os.path.exists(self.vectors_path) else 'wb') as f:
+                f.seek(next_row * self._dim * 4)
+                f.write(np.stack([v for _, v in pending]).tobytes())
+            conn.executemany(
+                "INSERT OR IGNORE INTO vectors (key, row) VALUES (?, ?)",
+                [(k, next_row + i) for i, (k, _) in enumerate(pending)]
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class EmbeddingService:
+    """
+    Content-hash keyed embedding cache in front of the shared SentenceTransformer:
+    an in-memory LRU backed by an optional DiskEmbeddingStore.
+    """
+
+    def __init__(self, max_entries: int = 5000, disk_store: Optional[DiskEmbeddingStore] = None):
+        self.max_entries = max_entries
+        self.disk_store = disk_store
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_key(text: str) -> str:
+        return hashlib.sha1(f"{EMBEDDING_MODEL_NAME}\0{text}".encode('utf-8')).hexdigest()
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Embed texts, running the model only for content that is not cached yet"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        keys = [self.cache_key(text) for text in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._lru and key not in vectors:
+                    self._lru.move_to_end(key)
+                    vectors[key] = self._lru[key]
+                    self.memory_hits += 1
+
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing and self.disk_store:
+            try:
+                from_disk = self.disk_store.get_many(missing)
+            except Exception as e:
+                logging.warning(f"Embedding disk store read failed: {e}")
+                from_disk = {}
+            vectors.update(from_disk)
+            self._remember(from_disk)
+            with self._lock:
+                self.disk_hits += len(from_disk)
+
+        missing_texts = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing_texts.setdefault(key, text)
+        if missing_texts:
+            encoded = get_embedder().encode(list(missing_texts.values()), batch_size=batch_size, convert_to_numpy=True)
+            computed = dict(zip(missing_texts.keys(), encoded.astype(np.float32)))
+            vectors.update(computed)
+            self._remember(computed)
+            with self._lock:
+                self.misses += len(computed)
+            if self.disk_store:
+                try:
+                    self.disk_store.put_many(list(computed.keys()), np.stack(list(computed.values())))
+                except Exception as e:
+                    logging.warning(f"Embedding disk store write failed: {e}")
+
+        return np.stack([vectors[key] for key in keys])
+
+    def _remember(self, vectors: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                self._lru[key] = vector
+                self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._lru),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+_embedding_service = None
+_embedding_service_lock = threading.Lock()
+
+
+def get_embedding_service() -> EmbeddingService:
+    """
+    Return the process-wide EmbeddingService. Set EMBEDDING_CACHE_DIR to persist
+    embeddings on disk; EMBEDDING_CACHE_SIZE bounds the in-memory LRU.
+    """
+    global _embedding_service
+    if _embedding_service is None:
+        with _embedding_service_lock:
+            if _embedding_service is None:
+                cache_dir = os.environ.get('EMBEDDING_CACHE_DIR')
+                disk_store = None
+                if cache_dir:
+                    disk_store = DiskEmbeddingStore(os.path.join(cache_dir, EMBEDDING_MODEL_NAME.replace('/', '_')))
+                _embedding_service = EmbeddingService(
+                    max_entries=int(os.environ.get('EMBEDDING_CACHE_SIZE', 5000)),
+                    disk_store=disk_store
+                )
+    return _embedding_service
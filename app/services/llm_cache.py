@@ -0,0 +1,101 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Optional, Dict, Any
+from langchain_core.messages import AIMessage, AIMessageChunk
+from app.services.search.cache.base import SearchCache
+from app.services.search.cache.memory_cache import MemorySearchCache
+from app.services.search.cache.sqlite_cache import SQLiteSearchCache
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> Optional[SearchCache]:
+    """
+    Return the process-wide utility LLM response cache selected by LLM_CACHE_BACKEND
+    ("memory", "sqlite" or "none"). It reuses the search cache stores: a thread-safe
+    LRU in memory, or a WAL-mode SQLite file shared by all workers on the host.
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                backend = os.environ.get('LLM_CACHE_BACKEND', 'memory').strip().lower()
+                max_entries = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 2000))
+                if backend == 'memory':
+                    _response_cache = MemorySearchCache(max_entries=max_entries)
+                elif backend == 'sqlite':
+                    path = os.environ.get('LLM_CACHE_PATH', os.path.join('instance', 'llm_cache.sqlite3'))
+                    _response_cache = SQLiteSearchCache(path, max_entries=max_entries)
+                else:
+                    _response_cache = False
+    return _response_cache or None
+
+
+class CachedChatModel:
+    """
+    Wraps a chat model so that an identical prompt sent to the same model and temperature
+    reuses the stored response. Meant for deterministic utility prompts (titles, fact
+    categorization); each call site opts out with use_cache=False. With no cache
+    configured every call goes straight to the model.
+    """
+
+    def __init__(self, model, cache: Optional[SearchCache], model_name: str, temperature: float, ttl: int = None):
+        self.model = model
+        self.cache = cache
+        self.model_name = model_name
+        self.temperature = temperature
+        self.ttl = ttl or int(os.environ.get('LLM_CACHE_TTL', 24 * 3600))
+
+    def cache_key(self, messages) -> str:
+        payload = json.dumps(
+            [self.model_name, self.temperature, [[message.type, message.content] for message in messages]],
+            sort_keys=True, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def invoke(self, messages, use_cache: bool = True, **kwargs):
+        if not use_cache or self.cache is None:
+            return self.model.invoke(messages, **kwargs)
+        key = self.cache_key(messages)
+        cached = self.cache.get(key)
+        if cached:
+            return AIMessage(content=cached[0]["content"])
+        response = self.model.invoke(messages, **kwargs)
+        if isinstance(response.content, str) and response.content.strip():
+            self.cache.set(key, [{"content": response.content}], ttl=self.ttl)
+        return response
+
+    def stream(self, messages, use_cache: bool = True, **kwargs):
+        if not use_cache or self.cache is None:
+            yield from self.model.stream(messages, **kwargs)
+            return
+        key = self.cache_key(messages)
+        cached = self.cache.get(key)
+        if cached:
+            yield AIMessageChunk(content=cached[0]["content"])
+            return
+        content = ""
+        for chunk in self.model.stream(messages, **kwargs):
+            if isinstance(chunk.content, str):
+                content += chunk.content
+            yield chunk
+        # Only reached when the caller consumed the whole stream
+        if content.strip():
+            self.cache.set(key, [{"content": content}], ttl=self.ttl)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """Return the response cache counters and hit rate"""
+    cache = get_llm_response_cache()
+    if not cache:
+        return {}
+    stats = cache.get_stats()
+    lookups = stats.get("hits", 0) + stats.get("misses", 0)
+    stats["hit_rate"] = stats.get("hits", 0) / lookups if lookups else 0.0
+    return stats
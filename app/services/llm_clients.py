@@ -0,0 +1,45 @@
+import os
+import time
+import threading
+from app.core.startup import record_startup_phase
+from .llm_gateway import GatewayChatModel, llm_gateway
+
+GEMINI_MODEL_NAME = os.environ.get('GEMINI_MODEL', 'gemini-2.0-flash')
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_chat_model(temperature: float = 0.7, model: str = GEMINI_MODEL_NAME):
+    """
+    Return a process-wide ChatGoogleGenerativeAI client for the given model and temperature,
+    routed through the shared LLM gateway (concurrency limit, rate limit, retries).
+    Reusing one client per model keeps its HTTP connections alive between calls.
+    langchain_google_genai is imported on first use rather than at app import time.
+    """
+    key = (model, temperature)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                start = time.monotonic()
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                client = GatewayChatModel(ChatGoogleGenerativeAI(
+                    model=model,
+                    google_api_key=os.environ.get("GOOGLE_API_KEY"),
+                    temperature=temperature,
+                    max_retries=1  # retries are handled by the gateway
+                ), model, llm_gateway)
+                _clients[key] = client
+                record_startup_phase(f"create llm client ({model}, t={temperature})", time.monotonic() - start)
+    return client
+
+
+def get_cached_chat_model(temperature: float = 0.3, model: str = GEMINI_MODEL_NAME):
+    """
+    Return the shared client for the given model and temperature wrapped in the
+    utility response cache (see llm_cache). invoke/stream accept use_cache=False.
+    """
+    from .llm_cache import CachedChatModel, get_llm_response_cache
+    return CachedChatModel(get_chat_model(temperature, model), get_llm_response_cache(), model, temperature)
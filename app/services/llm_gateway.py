@@ -0,0 +1,200 @@
+import os
+import time
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+# Status codes worth retrying: rate limited, overloaded or briefly unavailable upstream
+RETRYABLE_STATUS_CODES = {429, 500, 503, 504}
+# gRPC RESOURCE_EXHAUSTED, UNAVAILABLE and DEADLINE_EXCEEDED as their HTTP equivalents
+_GRPC_TO_HTTP = {8: 429, 14: 503, 4: 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _status_code(error: Exception) -> Optional[int]:
+    """Best-effort HTTP status of an upstream error (google.api_core, httpx and requests style)"""
+    for attribute in ('code', 'status_code'):
+        value = getattr(error, attribute, None)
+        value = value() if callable(value) else value
+        value = getattr(value, 'value', value)  # grpc.StatusCode / HTTPStatus enums
+        if isinstance(value, tuple):
+            value = _GRPC_TO_HTTP.get(value[0])
+        if isinstance(value, int):
+            return value
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds requested by a Retry-After header on the error's response, if any"""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMGateway:
+    """
+    Shared entry point for Gemini calls. Per model it bounds concurrent requests with a
+    semaphore, paces them with a token bucket, and retries rate-limit and transient
+    errors with jittered exponential backoff that honors Retry-After. Time spent
+    waiting for a slot is recorded so saturation shows up before upstream 429s do.
+    """
+
+    def __init__(self, max_concurrency: int = None, rate_per_second: float = None, burst: int = None,
+                 max_retries: int = None, backoff_base: float = 1.0, backoff_cap: float = 30.0):
+        self.max_concurrency = max_concurrency or int(os.environ.get('LLM_MAX_CONCURRENCY', 8))
+        self.rate_per_second = rate_per_second if rate_per_second is not None else float(os.environ.get('LLM_RATE_LIMIT_RPS', 0))
+        self.burst = burst or int(os.environ.get('LLM_RATE_LIMIT_BURST', 5))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get('LLM_MAX_RETRIES', 3))
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _model_state(self, model: str) -> Dict[str, Any]:
+        with self._lock:
+            state = self._models.get(model)
+            if state is None:
+                state = {
+                    "semaphore": threading.BoundedSemaphore(self.max_concurrency),
+                    "bucket": TokenBucket(self.rate_per_second, self.burst) if self.rate_per_second > 0 else None,
+                    "stats": {"calls": 0, "in_flight": 0, "retries": 0, "rate_limited": 0, "errors": 0,
+                              "queue_wait_total": 0.0, "queue_wait_max": 0.0},
+                }
+                self._models[model] = state
+            return state
+
+    def _record(self, state: Dict[str, Any], **changes) -> None:
+        with self._lock:
+            stats = state["stats"]
+            for name, amount in changes.items():
+                if name == "queue_wait":
+                    stats["queue_wait_total"] += amount
+                    stats["queue_wait_max"] = max(stats["queue_wait_max"], amount)
+                else:
+                    stats[name] += amount
+
+    @contextmanager
+    def slot(self, model: str):
+        """Hold one of the model's concurrency slots (after passing the rate limiter) for the block"""
+        state = self._model_state(model)
+        start = time.monotonic()
+        state["semaphore"].acquire()
+        try:
+            if state["bucket"]:
+                state["bucket"].acquire()
+            waited = time.monotonic() - start
+            self._record(state, calls=1, in_flight=1, queue_wait=waited)
+            if waited > 1.0:
+                logging.info(f"LLM call to {model} waited {waited:.2f}s for a slot")
+            try:
+                yield
+            finally:
+                self._record(state, in_flight=-1)
+        finally:
+            state["semaphore"].release()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_cap)
+        # Full jitter keeps workers that were throttled together from retrying in lockstep
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+
+    def _should_retry(self, model: str, attempt: int, error: Exception) -> bool:
+        state = self._model_state(model)
+        status = _status_code(error)
+        if status == 429:
+            self._record(state, rate_limited=1)
+        if status not in RETRYABLE_STATUS_CODES or attempt >= self.max_retries:
+            self._record(state, errors=1)
+            return False
+        self._record(state, retries=1)
+        delay = self._backoff(attempt, error)
+        logging.warning(f"LLM call to {model} failed with {status}; retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+        time.sleep(delay)
+        return True
+
+    def invoke(self, model: str, client, messages, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                with self.slot(model):
+                    return client.invoke(messages, **kwargs)
+            except Exception as e:
+                if not self._should_retry(model, attempt, e):
+                    raise
+                attempt += 1
+
+    def stream(self, model: str, client, messages, **kwargs):
+        """Stream chunks while holding a slot; a failure is only retried before the first chunk"""
+        attempt = 0
+        while True:
+            started = False
+            try:
+                with self.slot(model):
+                    for chunk in client.stream(messages, **kwargs):
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                if started or not self._should_retry(model, attempt, e):
+                    raise
+                attempt += 1
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stats = {}
+            for model, state in self._models.items():
+                model_stats = dict(state["stats"])
+                model_stats["queue_wait_avg"] = model_stats["queue_wait_total"] / model_stats["calls"] if model_stats["calls"] else 0.0
+                stats[model] = model_stats
+            return stats
+
+
+class GatewayChatModel:
+    """A chat model client whose invoke/stream calls go through the shared LLMGateway"""
+
+    def __init__(self, client, model_name: str, gateway: LLMGateway):
+        self.client = client
+        self.model_name = model_name
+        self.gateway = gateway
+
+    def invoke(self, messages, **kwargs):
+        return self.gateway.invoke(self.model_name, self.client, messages, **kwargs)
+
+    def stream(self, messages, **kwargs):
+        return self.gateway.stream(self.model_name, self.client, messages, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+llm_gateway = LLMGateway()
@@ -0,0 +1,91 @@
+import json
+import logging
+from typing import Any, Optional
+
+_CLOSERS = {'{': '}', '[': ']'}
+
+
+class StreamingJSONParser:
+    """
+    Finds the first complete top-level JSON object (or array) in LLM output as it streams in.
+    Tolerates prose and markdown fences around the value and braces inside strings. close()
+    repairs a value that was cut off mid-stream by closing open strings and brackets.
+    """
+
+    def __init__(self, expect: str = 'object'):
+        self.opener = '{' if expect == 'object' else '['
+        self.result = None
+        self.repaired = False
+        self._buffer = []
+        self._start = None
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def done(self) -> bool:
+        return self.result is not None
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        """Consume a chunk of text; returns the parsed value once it is complete"""
+        for char in chunk:
+            if self.done:
+                break
+            self._buffer.append(char)
+            if self._start is None:
+                if char == self.opener:
+                    self._start = len(self._buffer) - 1
+                    self._stack = [char]
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(char)
+            elif char in ('}', ']') and self._stack and _CLOSERS[self._stack[-1]] == char:
+                self._stack.pop()
+                if not self._stack:
+                    self._complete()
+        return self.result
+
+    def close(self) -> Optional[Any]:
+        """Finish parsing; returns the value, a repaired truncated value, or None"""
+        if self.done or self._start is None:
+            return self.result
+
+        text = ''.join(self._buffer[self._start:])
+        if self._in_string:
+            text += '"'
+        text = text.rstrip().rstrip(',')
+        if text.endswith(':'):
+            text += ' null'
+        text += ''.join(_CLOSERS[opener] for opener in reversed(self._stack))
+        try:
+            self.result = json.loads(text)
+            self.repaired = True
+        except json.JSONDecodeError:
+            logging.warning("Could not repair truncated JSON in LLM response.")
+        return self.result
+
+    def _complete(self) -> None:
+        text = ''.join(self._buffer[self._start:])
+        try:
+            self.result = json.loads(text)
+        except json.JSONDecodeError:
+            # Bracket-balanced but not valid JSON (e.g. a {placeholder} in prose); keep scanning
+            self._start = None
+
+
+def parse_json_response(content: str, expect: str = 'object') -> Optional[Any]:
+    """Parse the first JSON object (or array) from a complete LLM response"""
+    parser = StreamingJSONParser(expect)
+    parser.feed(content or '')
+    return parser.close()
+
@@ -0,0 +1,120 @@
+import os
+import logging
+from datetime import datetime, timezone
+from typing import List, Dict, Tuple
+import numpy as np
+from app.core.extensions import db
+from app.models import UserMemory, MemorySource
+from .embedding_service import get_embedding_service
+from .memory_index import load_memory_vectors, memory_index
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+class MemoryDeduplicator:
+    """
+    Detects near-duplicate memories by embedding similarity, so paraphrases like
+    "User is a software engineer" / "The user works as a software engineer"
+    reinforce one memory instead of creating two rows.
+    """
+
+    def __init__(self, threshold: float = None, importance_boost: float = 0.05):
+        self.threshold = threshold if threshold is not None else float(os.environ.get('MEMORY_DUPLICATE_THRESHOLD', 0.9))
+        self.importance_boost = importance_boost
+
+    def split_new_facts(self, user_id: int, facts: List[str]) -> Tuple[List[str], Dict[str, int]]:
+        """
+        Partition candidate facts into genuinely new ones and near-duplicates.
+        Returns (new_facts, duplicates) where duplicates maps a fact to the id of the
+        existing memory it repeats. Near-duplicates within `facts` keep only the first.
+        """
+        if not facts:
+            return [], {}
+        memories, existing = load_memory_vectors(user_id)
+        candidates = _normalize(np.asarray(get_embedding_service().encode(facts), dtype=np.float32))
+
+        new_facts, new_vectors, duplicates = [], [], {}
+        for fact, vector in zip(facts, candidates):
+            if len(memories):
+                similarities = existing @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    duplicates[fact] = memories[best].id
+                    continue
+            if new_vectors and float(np.max(np.stack(new_vectors) @ vector)) >= self.threshold:
+                continue
+            new_facts.append(fact)
+            new_vectors.append(vector)
+        return new_facts, duplicates
+
+    def reinforce(self, memory: UserMemory, chat_id: int = None) -> None:
+        """Bump an existing memory that was mentioned again instead of inserting a duplicate"""
+        memory.importance_score = min(1.0, (memory.importance_score or 0.5) + self.importance_boost)
+        memory.last_accessed_at = datetime.now(timezone.utc)
+        if chat_id is not None:
+            db.session.add(MemorySource(memory_id=memory.id, chat_id=chat_id))
+
+    def dedupe_user(self, user_id: int) -> int:
+        """
+        Merge near-duplicate memories of one user. Verified, then more important, then
+        older memories win; the sources of merged rows are moved to the survivor.
+        Returns the number of rows removed.
+        """
+        memories, matrix = load_memory_vectors(user_id)
+        if len(memories) < 2:
+            return 0
+
+        rows = {m.id: m for m in UserMemory.query.filter(UserMemory.id.in_([m.id for m in memories])).all()}
+        order = sorted(range(len(memories)), key=lambda i: (
+            not rows[memories[i].id].is_verified,
+            -(rows[memories[i].id].importance_score or 0.0),
+            memories[i].id
+        ))
+
+        kept_indices: List[int] = []
+        removed = 0
+        for i in order:
+            if kept_indices:
+                similarities = matrix[kept_indices] @ matrix[i]
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._merge(rows[memories[kept_indices[best]].id], rows[memories[i].id])
+                    removed += 1
+                    continue
+            kept_indices.append(i)
+
+        if removed:
+            db.session.commit()
+            memory_index.invalidate(user_id)
+        return removed
+
+    def dedupe_all(self) -> int:
+        """Run dedupe_user for every user that has active memories"""
+        user_ids = [uid for uid, in db.session.query(UserMemory.user_id).filter_by(is_active=True).distinct()]
+        total = 0
+        for user_id in user_ids:
+            try:
+                removed = self.dedupe_user(user_id)
+            except Exception as e:
+                db.session.rollback()
+                logging.error(f"Memory dedupe failed for user {user_id}: {e}")
+                continue
+            if removed:
+                logging.info(f"Merged {removed} near-duplicate memories for user {user_id}")
+            total += removed
+        return total
+
+    def _merge(self, survivor: UserMemory, duplicate: UserMemory) -> None:
+        survivor.importance_score = min(1.0, max(survivor.importance_score or 0.0, duplicate.importance_score or 0.0)
+                                        + self.importance_boost)
+        survivor.confidence_score = max(survivor.confidence_score or 0.0, duplicate.confidence_score or 0.0)
+        survivor.is_verified = survivor.is_verified or duplicate.is_verified
+        if duplicate.last_accessed_at and (not survivor.last_accessed_at or duplicate.last_accessed_at > survivor.last_accessed_at):
+            survivor.last_accessed_at = duplicate.last_accessed_at
+        MemorySource.query.filter_by(memory_id=duplicate.id).update(
+            {'memory_id': survivor.id}, synchronize_session=False
+        )
+        db.session.delete(duplicate)
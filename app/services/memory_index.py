@@ -0,0 +1,109 @@
+import time
+import logging
+import threading
+from typing import List, Tuple
+import numpy as np
+from app.core.extensions import db
+from app.models import UserMemory
+from .embedding_service import get_embedding_service
+
+
+def embed_memory_text(content: str) -> bytes:
+    """Embed a memory's content and serialise it for the UserMemory.embedding column"""
+    vector = get_embedding_service().encode([content])[0]
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def load_memory_vectors(user_id: int, verified_only: bool = False) -> Tuple[list, np.ndarray]:
+    """
+    Load a user's active memories with L2-normalised embeddings, one matrix row per memory.
+    Embeddings missing from rows created before they were stored are computed and saved.
+    """
+    query = db.session.query(
+        UserMemory.id, UserMemory.content, UserMemory.embedding, UserMemory.importance_score
+    ).filter_by(user_id=user_id, is_active=True)
+    if verified_only:
+        query = query.filter_by(is_verified=True)
+    memories = query.order_by(UserMemory.id).all()
+    if not memories:
+        return [], np.zeros((0, 0), dtype=np.float32)
+
+    missing = [m for m in memories if m.embedding is None]
+    vectors = {m.id: np.frombuffer(m.embedding, dtype=np.float32) for m in memories if m.embedding is not None}
+    if missing:
+        encoded = get_embedding_service().encode([m.content for m in missing])
+        for memory, vector in zip(missing, encoded):
+            vectors[memory.id] = np.asarray(vector, dtype=np.float32)
+            UserMemory.query.filter_by(id=memory.id).update(
+                {'embedding': vectors[memory.id].tobytes()}, synchronize_session=False
+            )
+        try:
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.warning(f"Could not store backfilled memory embeddings for user {user_id}: {e}")
+
+    matrix = np.stack([vectors[m.id] for m in memories])
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return memories, matrix / np.where(norms == 0, 1.0, norms)
+
+
+class MemoryVectorIndex:
+    """
+    Per-user in-process matrix of memory embeddings. Built lazily on first search,
+    dropped by invalidate() on writes and rebuilt after `ttl` seconds so that
+    writes made by other worker processes are picked up.
+    """
+
+    def __init__(self, ttl: int = 300, max_users: int = 1000):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def search(self, user_id: int, query_vector: np.ndarray, top_k: int = 5, min_similarity: float = 0.35,
+               importance_weight: float = 0.2) -> List[Tuple[int, float]]:
+        """
+        Return up to top_k (memory_id, score) pairs, best first. Memories below
+        min_similarity are never returned; the rest are ranked by cosine similarity
+        blended with importance_score.
+        """
+        entry = self._get_entry(user_id)
+        if not entry['ids']:
+            return []
+        ids, matrix, importance = entry['ids'], entry['matrix'], entry['importance']
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        similarities = matrix @ query
+        scores = (1 - importance_weight) * similarities + importance_weight * importance
+
+        candidates = np.where(similarities >= min_similarity)[0]
+        ranked = candidates[np.argsort(scores[candidates])[::-1]][:top_k]
+        return [(ids[i], float(scores[i])) for i in ranked]
+
+    def _get_entry(self, user_id: int) -> dict:
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry['built_at'] < self.ttl:
+            return entry
+
+        entry = self._build(user_id)
+        with self._lock:
+            if len(self._entries) >= self.max_users:
+                oldest = min(self._entries, key=lambda uid: self._entries[uid]['built_at'])
+                del self._entries[oldest]
+            self._entries[user_id] = entry
+        return entry
+
+    def _build(self, user_id: int) -> dict:
+        memories, matrix = load_memory_vectors(user_id, verified_only=True)
+        importance = np.array([m.importance_score or 0.0 for m in memories], dtype=np.float32)
+        return {'built_at': time.monotonic(), 'ids': [m.id for m in memories], 'matrix': matrix, 'importance': importance}
+
+
+memory_index = MemoryVectorIndex()
@@ -1,20 +1,46 @@
+import os
 import logging
+from datetime import datetime
 from app.core.extensions import db
-from app.models import UserMemory, MemoryCategory, ChatSummary, MemorySource, Chat
+from app.core.pagination import encode_cursor, decode_cursor, keyset_page
+from app.models import UserMemory, ChatSummary, MemorySource, Chat
 from flask_login import current_user
 from sqlalchemy.exc import IntegrityError
-from langchain.schema import HumanMessage
+from langchain_core.messages import HumanMessage
+from .llm_clients import get_cached_chat_model
+from .embedding_service import get_embedding_service
+from .memory_index import memory_index, embed_memory_text
+from .memory_dedup import MemoryDeduplicator
+from .category_registry import category_registry
+from .llm_json import parse_json_response
 
 logging.basicConfig(level=logging.INFO)
 
 class UserMemoryService:
     """Service for managing a user's long-term memory."""
 
-    def get_relevant_memories(self, user_id: int, top_k: int = 5):
+    def get_relevant_memories(self, user_id: int, query: str = None, top_k: int = 5,
+                              min_similarity: float = None, importance_weight: float = None):
         """
         Retrieve the most relevant long-term memories for a user.
-        Currently uses importance and access time as a proxy for relevance.
+        With a query, memories are ranked by cosine similarity to it blended with importance,
+        and nothing is returned when no memory reaches min_similarity. Without a query,
+        importance and access time are used as a proxy for relevance.
         """
+        if query and query.strip():
+            min_similarity = min_similarity if min_similarity is not None else float(os.environ.get('MEMORY_SIMILARITY_THRESHOLD', 0.35))
+            importance_weight = importance_weight if importance_weight is not None else float(os.environ.get('MEMORY_IMPORTANCE_WEIGHT', 0.2))
+            try:
+                query_vector = get_embedding_service().encode([query.strip()])[0]
+                ranked = memory_index.search(user_id, query_vector, top_k, min_similarity, importance_weight)
+            except Exception as e:
+                logging.error(f"Semantic memory retrieval failed, falling back to importance ranking: {e}")
+            else:
+                if not ranked:
+                    return []
+                memories = {m.id: m for m in UserMemory.query.filter(UserMemory.id.in_([mid for mid, _ in ranked])).all()}
+                return [memories[mid] for mid, _ in ranked if mid in memories]
+
         return UserMemory.query.filter_by(
             user_id=user_id,
             is_active=True,
@@ -24,23 +50,45 @@ class UserMemoryService:
             UserMemory.last_accessed_at.desc()
         ).limit(top_k).all()
 
-    def get_memories_by_category(self, user_id: int, category_id: int, page: int = 1, per_page: int = 10):
-        """Retrieve paginated memories for a user in a specific category."""
-        return UserMemory.query.filter_by(
-            user_id=user_id, 
-            category_id=category_id,
-            is_active=True
-        ).order_by(
-            UserMemory.importance_score.desc(), 
-            UserMemory.last_accessed_at.desc()
-        ).paginate(page=page, per_page=per_page, error_out=False)
+    def list_memories(self, user_id: int, category_id: int = None, limit: int = 20,
+                      cursor: str = None, include_total: bool = False) -> dict:
+        """
+        Retrieve a page of a user's active memories using keyset pagination.
+        Without a category, memories are ordered by recency; within a category, by importance.
+        Returns {"memories", "next_cursor", "total"}; total is only counted when requested.
+        Raises ValueError for a malformed cursor.
+        """
+        query = UserMemory.query.filter_by(user_id=user_id, is_active=True)
+        if category_id:
+            query = query.filter_by(category_id=category_id)
+            columns = [UserMemory.importance_score, UserMemory.last_accessed_at, UserMemory.id]
+            cursor_types = (float, datetime, int)
+        else:
+            columns = [UserMemory.last_accessed_at, UserMemory.id]
+            cursor_types = (datetime, int)
 
-    def get_all_memories(self, user_id: int, page: int = 1, per_page: int = 20):
-        """Retrieve all of a user's memories, paginated."""
-        return UserMemory.query.filter_by(
-            user_id=user_id,
-            is_active=True
-        ).order_by(UserMemory.last_accessed_at.desc()).paginate(page=page, per_page=per_page, error_out=False)
+        total = query.count() if include_total else None
+        memories, has_more = keyset_page(query, columns, decode_cursor(cursor, *cursor_types), limit)
+
+        next_cursor = None
+        if has_more:
+            last = memories[-1]
+            next_cursor = encode_cursor(*[getattr(last, column.key) for column in columns])
+        return {"memories": memories, "next_cursor": next_cursor, "total": total}
+
+    def get_memories_version(self, user_id: int) -> tuple:
+        """
+        (newest updated_at, row count, newest id) of a user's memories. Every ORM edit bumps
+        updated_at and inserts or deletes change the count or id, so this changes whenever a
+        memory listing could.
+        """
+        return tuple(db.session.query(
+            db.func.max(UserMemory.updated_at), db.func.count(UserMemory.id), db.func.max(UserMemory.id)
+        ).filter(UserMemory.user_id == user_id).one())
+
+    def get_category_names(self) -> dict:
+        """Map of category id to name, from the category registry."""
+        return category_registry.get().names_by_id
 
     def create_memory(self, data: dict) -> UserMemory:
         """Create a new memory entry for the current user."""
@@ -50,10 +98,12 @@ class UserMemoryService:
             title=data.get('title'),
             content=data.get('content'),
             importance_score=data.get('importance_score', 0.5),
-            source_type=data.get('source_type', 'user_provided')
+            source_type=data.get('source_type', 'user_provided'),
+            embedding=embed_memory_text(data.get('content'))
         )
         db.session.add(memory)
         db.session.commit()
+        memory_index.invalidate(memory.user_id)
         return memory
 
     def update_memory(self, memory_id: int, data: dict) -> UserMemory:
@@ -63,10 +113,14 @@ class UserMemoryService:
             raise PermissionError("User does not have permission to edit this memory.")
         
         memory.title = data.get('title', memory.title)
-        memory.content = data.get('content', memory.content)
+        new_content = data.get('content', memory.content)
+        if new_content != memory.content or memory.embedding is None:
+            memory.embedding = embed_memory_text(new_content)
+        memory.content = new_content
         memory.category_id = data.get('category_id', memory.category_id)
         memory.importance_score = data.get('importance_score', memory.importance_score)
         db.session.commit()
+        memory_index.invalidate(memory.user_id)
         return memory
 
     def delete_memory(self, memory_id: int):
@@ -77,6 +131,7 @@ class UserMemoryService:
         
         db.session.delete(memory)
         db.session.commit()
+        memory_index.invalidate(current_user.id)
 
     def verify_memory(self, memory_id: int, is_verified: bool = True) -> UserMemory:
         """Mark a memory as verified by the user."""
@@ -87,22 +142,35 @@ class UserMemoryService:
         memory.is_verified = is_verified
         memory.confidence_score = 1.0 if is_verified else 0.4 
         db.session.commit()
+        memory_index.invalidate(memory.user_id)
         return memory
 
     def get_all_categories(self):
-        """Get all available memory categories."""
-        return MemoryCategory.query.filter_by(is_active=True).order_by(MemoryCategory.name).all()
+        """Get the active memory categories as dicts, with the registry's etag."""
+        snapshot = category_registry.get()
+        return snapshot.categories, snapshot.etag
 
 class MemoryExtractionService:
     """Service for extracting long-term memories from chat conversations."""
 
-    def __init__(self, llm):
-        self.llm = llm
+    def __init__(self, llm=None):
+        self._llm = llm
+        self.deduplicator = MemoryDeduplicator()
+
+    @property
+    def llm(self):
+        # Categorizing the same fact against the same categories is served from the response cache
+        return self._llm or get_cached_chat_model(temperature=0.3)
 
-    def extract_memories_from_chat(self, chat: Chat):
+    def extract_memories_from_chat(self, chat: Chat, batch: bool = True):
         """
         Analyzes a chat summary to extract potential long-term memories,
         categorizes them, and saves them to the database.
+        The summary's extracted_facts are consumed, so each fact is processed at most once
+        even if this runs again before the next summary update.
+        With batch=True all facts are categorized in one LLM call; if the batched response
+        can't be used, facts are categorized one at a time. Either way they are saved in one
+        transaction, with near-duplicates of existing memories merged rather than inserted.
         """
         logging.info(f"Starting memory extraction for chat {chat.id}")
         if not chat.summary or not chat.summary.extracted_facts:
@@ -110,14 +178,23 @@ class MemoryExtractionService:
             return
 
         facts = chat.summary.extracted_facts
+        chat.summary.extracted_facts = []
+        db.session.commit()
         if not isinstance(facts, list) or not facts:
             logging.info(f"No new facts to process for chat {chat.id}.")
             return
+        facts = [fact.strip() for fact in facts if isinstance(fact, str) and fact.strip()]
             
-        categories = MemoryCategory.query.all()
-        category_map = {cat.name: cat.id for cat in categories}
-        category_prompt_list = "\n".join([f"- {cat.name}: {cat.description}" for cat in categories])
+        category_map, category_prompt_list = self.get_category_prompt()
+
+        if batch and len(facts) > 1:
+            categorized = self._categorize_facts_batch(facts, category_map, category_prompt_list)
+            if categorized is not None:
+                self._save_memories_bulk(chat, categorized)
+                return
+            logging.warning(f"Batch categorization failed for chat {chat.id}, falling back to one call per fact.")
 
+        categorized = []
         for fact in facts:
             try:
                 # Use the LLM to categorize the fact
@@ -135,32 +212,148 @@ class MemoryExtractionService:
                 category_name = response.content.strip()
 
                 if category_name in category_map:
-                    category_id = category_map[category_name]
-                    
-                    # Create the UserMemory object
-                    new_memory = UserMemory(
-                        user_id=chat.user_id,
-                        category_id=category_id,
-                        title=fact[:150],  # Use the fact as a title, truncated
-                        content=fact,
-                        source_type='extracted',
-                        confidence_score=0.6, # Initial confidence for extracted memories
-                        importance_score=0.5  # Default importance
-                    )
-                    db.session.add(new_memory)
-                    db.session.flush() # Flush to get the new_memory.id
-
-                    # Link it to the source chat
-                    new_source = MemorySource(memory_id=new_memory.id, chat_id=chat.id)
-                    db.session.add(new_source)
-                    db.session.commit()
-                    logging.info(f"Successfully created and saved new memory: '{fact}' under category '{category_name}'")
+                    categorized.append((fact, category_map[category_name]))
                 else:
                     logging.warning(f"LLM returned an invalid category '{category_name}' for fact '{fact}'")
-
-            except IntegrityError:
-                db.session.rollback()
-                logging.warning(f"Memory for fact '{fact}' might already exist. Skipping.")
             except Exception as e:
-                db.session.rollback()
-                logging.error(f"Failed to create memory for fact '{fact}'. Error: {e}")
+                logging.error(f"Failed to categorize fact '{fact}'. Error: {e}")
+
+        if categorized:
+            self._save_memories_bulk(chat, categorized)
+
+    @staticmethod
+    def get_category_prompt():
+        """Return the {name: id} map of memory categories and their listing for LLM prompts"""
+        snapshot = category_registry.get()
+        return snapshot.ids_by_name, snapshot.prompt_text
+
+    def save_categorized_facts(self, chat: Chat, facts: list):
+        """
+        Save facts that were already categorized elsewhere (e.g. by the combined post-turn call).
+        `facts` holds {"fact": ..., "category": <category name>} items; unknown categories are skipped.
+        """
+        category_map, _ = self.get_category_prompt()
+        categorized = []
+        for item in facts if isinstance(facts, list) else []:
+            if not isinstance(item, dict):
+                continue
+            fact = str(item.get('fact') or '').strip()
+            category_name = str(item.get('category') or '').strip()
+            if not fact:
+                continue
+            if category_name not in category_map:
+                logging.warning(f"LLM returned an invalid category '{category_name}' for fact '{fact}'")
+                continue
+            categorized.append((fact, category_map[category_name]))
+        if categorized:
+            self._save_memories_bulk(chat, categorized)
+
+    def _categorize_facts_batch(self, facts: list, category_map: dict, category_prompt_list: str):
+        """
+        Categorize all facts with a single structured-output call.
+        Returns a list of (fact, category_id) pairs, or None if the response was unusable.
+        """
+        numbered_facts = "\n".join(f"{i}. {fact}" for i, fact in enumerate(facts, start=1))
+        prompt = f"""
+        Assign each of the following facts about a user to the category it best fits into.
+
+        Facts:
+        {numbered_facts}
+
+        Categories:
+        {category_prompt_list}
+
+        Respond ONLY with a JSON array containing one object per fact, with the keys
+        "index" (the fact number) and "category" (a category name exactly as written above).
+        Do not include any other text or markdown formatting.
+        """
+        try:
+            response = self.llm.invoke([HumanMessage(content=prompt)])
+            items = parse_json_response(response.content, expect='array')
+            if items is None:
+                logging.warning(f"No JSON array found in the batch categorization response. Raw content: '{response.content}'")
+                return None
+        except Exception as e:
+            logging.error(f"Batch categorization call failed: {e}")
+            return None
+
+        categorized = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            index = item.get('index')
+            category_name = str(item.get('category', '')).strip()
+            if not isinstance(index, int) or not 1 <= index <= len(facts):
+                continue
+            if category_name not in category_map:
+                logging.warning(f"LLM returned an invalid category '{category_name}' for fact '{facts[index - 1]}'")
+                continue
+            categorized[index - 1] = category_map[category_name]
+
+        if not categorized:
+            return None
+        return [(facts[i], category_id) for i, category_id in sorted(categorized.items())]
+
+    def _save_memories_bulk(self, chat: Chat, categorized_facts: list):
+        """
+        Insert all new memories and their sources for a chat in a single transaction.
+        Facts that repeat an existing memory (exactly or as a near-duplicate) reinforce
+        that memory instead of creating a new row; an exact repeat of a deactivated
+        memory reactivates it.
+        """
+        unique_facts = {}
+        for fact, category_id in categorized_facts:
+            unique_facts.setdefault(fact, category_id)
+
+        new_facts, duplicates = self.deduplicator.split_new_facts(chat.user_id, list(unique_facts.keys()))
+
+        try:
+            for fact, memory_id in duplicates.items():
+                existing = UserMemory.query.get(memory_id)
+                if existing:
+                    self.deduplicator.reinforce(existing, chat_id=chat.id)
+                    logging.info(f"Fact '{fact}' repeats memory {memory_id}; reinforced it instead of inserting.")
+
+            # Deactivated memories are not compared by similarity, but their content is still
+            # unique per user, so an exact repeat brings the old row back instead of inserting
+            reactivated = UserMemory.query.filter(
+                UserMemory.user_id == chat.user_id, UserMemory.content.in_(new_facts)
+            ).all() if new_facts else []
+            for existing in reactivated:
+                existing.is_active = True
+                self.deduplicator.reinforce(existing, chat_id=chat.id)
+            reactivated_facts = {existing.content for existing in reactivated}
+
+            new_memories = []
+            for fact in new_facts:
+                if fact in reactivated_facts:
+                    continue
+                memory = self._build_memory(chat, fact, unique_facts[fact])
+                try:
+                    # A savepoint per row, so a concurrent insert of one fact doesn't discard the rest
+                    with db.session.begin_nested():
+                        db.session.add(memory)
+                    new_memories.append(memory)
+                except IntegrityError:
+                    logging.warning(f"Memory '{fact}' was inserted concurrently for chat {chat.id}; skipping it.")
+            db.session.add_all([MemorySource(memory_id=memory.id, chat_id=chat.id) for memory in new_memories])
+            db.session.commit()
+            memory_index.invalidate(chat.user_id)
+            logging.info(f"Saved {len(new_memories)} new, reactivated {len(reactivated)} and reinforced "
+                         f"{len(duplicates)} existing memories for chat {chat.id}.")
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Failed to save memories for chat {chat.id}. Error: {e}")
+
+    @staticmethod
+    def _build_memory(chat: Chat, fact: str, category_id: int) -> UserMemory:
+        return UserMemory(
+            user_id=chat.user_id,
+            category_id=category_id,
+            title=fact[:150],  # Use the fact as a title, truncated
+            content=fact,
+            source_type='extracted',
+            confidence_score=0.6, # Initial confidence for extracted memories
+            importance_score=0.5, # Default importance
+            embedding=embed_memory_text(fact)
+        )
@@ -1,19 +1,22 @@
 import os
 import requests
 from typing import List, Dict, Any, Optional
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from langchain_core.documents import Document
 from bs4 import BeautifulSoup
-import time
-import random
 from app.services.search.providers.tavily_provider import TavilySearchProvider
 from app.services.search.providers.bing_provider import BingSearchProvider
 from app.services.search.providers.duckduckgo_provider import DuckDuckGoSearchProvider
-import logging
-
-# Suppress noisy logs from the sentence-transformers library
-logging.getLogger("sentence_transformers").setLevel(logging.WARNING)
+from app.services.search.strategies.concurrent_strategy import ConcurrentSearchStrategy
+from app.services.search.scraper import ParallelScraper
+from app.services.search.http_client import get_http_session, get_timeout
+from app.services.search.chunking import split_into_passages
+from app.services.search.cache.base import SearchCache
+from app.services.search.cache.memory_cache import MemorySearchCache
+from app.services.search.cache.sqlite_cache import SQLiteSearchCache
+from app.services.search.cache.cached_provider import CachedSearchProvider
+from app.services.search.cache.page_cache import PageContentCache
+from app.services.embedding_service import get_embedder, get_embedding_service
 
 
 class RAGService:
@@ -23,7 +26,6 @@ class RAGService:
         Args:
             search_provider_names: list of provider names to use (e.g., ["tavily", "bing", "duckduckgo"])
         """
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
         self.providers = []
         provider_names = search_provider_names or os.environ.get('SEARCH_PROVIDERS', 'tavily,bing,duckduckgo').split(',')
         provider_names = [p.strip().lower() for p in provider_names]
@@ -39,6 +41,56 @@ class RAGService:
             if provider.is_available():
                 self.providers.append(provider)
 
+        self.search_cache = self._create_search_cache()
+        if self.search_cache:
+            cache_ttl = int(os.environ.get('SEARCH_CACHE_TTL', 3600))
+            self.providers = [CachedSearchProvider(p, self.search_cache, ttl=cache_ttl) for p in self.providers]
+
+        self.page_cache = self._create_page_cache()
+        self.search_strategy = ConcurrentSearchStrategy()
+        self.scraper = ParallelScraper(fetch=self._scrape_url_content)
+
+    @property
+    def embedder(self):
+        """The shared SentenceTransformer, loaded on first use"""
+        return get_embedder()
+
+    @staticmethod
+    def _create_search_cache() -> Optional[SearchCache]:
+        """
+        Build the search result cache selected by SEARCH_CACHE_BACKEND ("memory", "sqlite" or "none").
+        """
+        backend = os.environ.get('SEARCH_CACHE_BACKEND', 'memory').strip().lower()
+        max_entries = int(os.environ.get('SEARCH_CACHE_MAX_ENTRIES', 1000))
+        if backend == 'memory':
+            return MemorySearchCache(max_entries=max_entries)
+        if backend == 'sqlite':
+            path = os.environ.get('SEARCH_CACHE_PATH', os.path.join('instance', 'search_cache.sqlite3'))
+            return SQLiteSearchCache(path, max_entries=max_entries)
+        return None
+
+    @staticmethod
+    def _create_page_cache() -> Optional[PageContentCache]:
+        """
+        Build the scraped page cache unless PAGE_CACHE_ENABLED is false.
+        """
+        if os.environ.get('PAGE_CACHE_ENABLED', 'true').strip().lower() in ('0', 'false', 'no'):
+            return None
+        return PageContentCache(
+            os.environ.get('PAGE_CACHE_PATH', os.path.join('instance', 'page_cache.sqlite3')),
+            max_bytes=int(os.environ.get('PAGE_CACHE_MAX_MB', 200)) * 1024 * 1024,
+            max_age=int(os.environ.get('PAGE_CACHE_MAX_AGE', 7 * 24 * 3600)),
+            revalidate_after=int(os.environ.get('PAGE_CACHE_REVALIDATE_AFTER', 3600))
+        )
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters of the search result, page and embedding caches"""
+        return {
+            "search": self.search_cache.get_stats() if self.search_cache else {},
+            "pages": self.page_cache.get_stats() if self.page_cache else {},
+            "embeddings": get_embedding_service().get_stats(),
+        }
+
     def _scrape_url_content(self, url: str) -> Optional[str]:
         """
         Scrapes the main text content from a given URL.
@@ -48,7 +100,19 @@ class RAGService:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/117.0.0.0 Safari/537.36'
             }
-            response = requests.get(url, headers=headers, timeout=10)
+            cached_page = self.page_cache.get(url) if self.page_cache else None
+            if cached_page:
+                if cached_page['is_fresh']:
+                    return cached_page['content']
+                if cached_page['etag']:
+                    headers['If-None-Match'] = cached_page['etag']
+                if cached_page['last_modified']:
+                    headers['If-Modified-Since'] = cached_page['last_modified']
+
+            response = get_http_session().get(url, headers=headers, timeout=get_timeout())
+            if response.status_code == 304 and cached_page:
+                self.page_cache.mark_revalidated(url)
+                return cached_page['content']
             response.raise_for_status()
 
             soup = BeautifulSoup(response.content, 'html.parser')
@@ -64,8 +128,16 @@ class RAGService:
                 text_content = soup.get_text(separator=' ', strip=True)
             
             cleaned_text = ' '.join(text_content.split())
-            
-            return cleaned_text if len(cleaned_text) > 300 else None
+            if len(cleaned_text) <= 300:
+                return None
+
+            if self.page_cache:
+                self.page_cache.set(
+                    url, cleaned_text,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified')
+                )
+            return cleaned_text
 
         except requests.HTTPError as e:
             print(f"HTTP error for {url}: {e}")
@@ -79,16 +151,14 @@ class RAGService:
 
     def get_context(self, query: str, num_results: int = 5) -> Dict[str, Any]:
         """
-        Run the query on all configured providers, scrape, rerank, and return structured context.
+        Run the query on all configured providers, scrape, pick the most relevant passages
+        and return structured context.
         """
-        all_results = []
-        for provider in self.providers:
-            try:
-                results = provider.search(query, num_results=3) 
-                all_results.extend(results)
-            except Exception as e:
-                print(f"Search error with {provider.get_provider_name()}: {e}")
-        
+        all_results, search_report = self.search_strategy.execute_search_with_report(query, self.providers, num_results=3)
+        for name, entry in search_report.items():
+            if entry["status"] != "ok":
+                print(f"Search {entry['status']} with {name}: {entry.get('error', 'deadline exceeded')}")
+
         if not all_results:
             return {"context": "", "sources": []}
 
@@ -99,50 +169,59 @@ class RAGService:
              print("Warning: Scraping failed for all URLs, and no fallback content was available.")
              return {"context": "", "sources": []}
 
-        reranked_docs = self.rerank_documents(query, valid_documents, top_k=3)
-        
+        passages = self.retrieve_passages(query, valid_documents)
+
+        # Group the selected passages by page; sources are numbered by their best passage
+        grouped = {}
+        for passage in passages:
+            grouped.setdefault(passage.metadata.get('url', '#'), []).append(passage)
+
         context_parts = []
         sources = []
-        for i, doc in enumerate(reranked_docs):
-            context_parts.append(f"Source [{i+1}]: {doc.page_content}")
+        for i, page_passages in enumerate(grouped.values()):
+            page_passages.sort(key=lambda p: p.metadata['chunk_index'])
+            metadata = page_passages[0].metadata
+            excerpts = "\n...\n".join(p.page_content for p in page_passages)
+            context_parts.append(f"Source [{i+1}]: Title: {metadata.get('title', '')}\n{excerpts}")
             sources.append({
                 "id": i + 1,
-                "title": doc.metadata.get('title', 'Untitled'),
-                "url": doc.metadata.get('url', '#')
+                "title": metadata.get('title', 'Untitled'),
+                "url": metadata.get('url', '#')
             })
-            
+
         context = "\n\n".join(context_parts)
-        
+
         return {"context": context, "sources": sources}
 
     def extract_content_from_results(self, search_results: List[Dict[str, Any]]) -> List[Document]:
         """
-        Scrapes URLs with a polite delay and has better fallback logic.
+        Scrapes all result URLs concurrently and falls back to the search snippet
+        for pages that failed or did not finish within the scrape budget.
         """
         documents = []
+        unique_results = []
         urls_processed = set()
 
         for result in search_results:
             url = result.get('url')
             if not url or url in urls_processed:
                 continue
-            
             urls_processed.add(url)
-            
-            delay = random.uniform(0.5, 1.5)
-            print(f"Waiting for {delay:.2f}s before scraping...")
-            time.sleep(delay)
-            
-            print(f"Scraping: {url}")
-            scraped_content = self._scrape_url_content(url)
-            
+            unique_results.append(result)
+
+        scraped_pages = self.scraper.scrape([result['url'] for result in unique_results])
+
+        for result in unique_results:
+            url = result['url']
+            scraped_content = scraped_pages.get(url)
+
             if scraped_content:
-                print(f"  -> Successfully scraped {len(scraped_content)} characters.")
+                print(f"Scraped {url}: {len(scraped_content)} characters.")
                 page_text = scraped_content
             else:
-                print(f"  -> Scraping failed. Falling back to snippet.")
-                page_text = result.get('snippet', '')
-            
+                print(f"Scraping failed or timed out for {url}. Falling back to snippet.")
+                page_text = result.get('snippet') or result.get('content', '')
+
             if page_text:
                 full_content = f"Title: {result.get('title', '')}\nContent: {page_text}"
 
@@ -150,7 +229,7 @@ class RAGService:
                     page_content=full_content,
                     metadata={
                         'title': result.get('title', ''),
-                        'url': result.get('url', ''),
+                        'url': url,
                         'source': result.get('provider', 'unknown') 
                     }
                 )
@@ -158,13 +237,52 @@ class RAGService:
             
         return documents
     
+    def retrieve_passages(self, query: str, documents: List[Document], top_k: Optional[int] = None,
+                          char_budget: Optional[int] = None) -> List[Document]:
+        """
+        Split documents into overlapping passages, embed them in batches and return the
+        passages most similar to the query, best first, within a total character budget.
+        """
+        top_k = top_k or int(os.environ.get('RAG_PASSAGE_TOP_K', 8))
+        char_budget = char_budget or int(os.environ.get('RAG_CONTEXT_CHAR_BUDGET', 6000))
+        chunk_size = int(os.environ.get('RAG_CHUNK_SIZE', 800))
+        chunk_overlap = int(os.environ.get('RAG_CHUNK_OVERLAP', 150))
+
+        passages = []
+        for doc in documents:
+            # Documents are built as "Title: ...\nContent: ..."; chunk the content only
+            text = doc.page_content.split('\nContent: ', 1)[-1]
+            for chunk_index, chunk in enumerate(split_into_passages(text, chunk_size, chunk_overlap)):
+                passages.append(Document(page_content=chunk, metadata={**doc.metadata, 'chunk_index': chunk_index}))
+        if not passages:
+            return []
+
+        embedding_service = get_embedding_service()
+        query_embedding = embedding_service.encode([query])
+        passage_embeddings = embedding_service.encode([p.page_content for p in passages], batch_size=64)
+        similarities = np.dot(passage_embeddings, query_embedding.T).flatten()
+
+        selected = []
+        used_chars = 0
+        for i in np.argsort(similarities)[::-1]:
+            passage = passages[i]
+            if used_chars + len(passage.page_content) > char_budget:
+                continue
+            passage.metadata['score'] = float(similarities[i])
+            selected.append(passage)
+            used_chars += len(passage.page_content)
+            if len(selected) >= top_k:
+                break
+        return selected
+
     def rerank_documents(self, query: str, documents: List[Document], top_k: int = 3) -> List[Document]:
         """Rerank documents using semantic similarity"""
         if not documents:
             return []
         
-        query_embedding = self.embedder.encode([query])
-        doc_embeddings = self.embedder.encode([doc.page_content for doc in documents])
+        embedding_service = get_embedding_service()
+        query_embedding = embedding_service.encode([query])
+        doc_embeddings = embedding_service.encode([doc.page_content for doc in documents])
         
         similarities = np.dot(doc_embeddings, query_embedding.T).flatten()
         
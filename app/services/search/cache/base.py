@@ -19,6 +19,10 @@ class SearchCache(ABC):
         """Clear all cached results"""
         pass
 
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters for this cache"""
+        return {}
+
     def generate_cache_key(self, query: str, provider: str, num_results: int) -> str:
         """Generate consistent cache key"""
         key_string = f"{query}:{provider}:{num_results}"
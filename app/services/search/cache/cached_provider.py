@@ -0,0 +1,32 @@
+from typing import List, Dict, Any
+from app.services.search.providers.base import SearchProvider
+from .base import SearchCache
+
+
+class CachedSearchProvider(SearchProvider):
+    """Wraps a search provider so identical queries are served from a SearchCache"""
+
+    def __init__(self, provider: SearchProvider, cache: SearchCache, ttl: int = 3600):
+        self.provider = provider
+        self.cache = cache
+        self.ttl = ttl
+
+    def get_provider_name(self) -> str:
+        return self.provider.get_provider_name()
+
+    def is_available(self) -> bool:
+        return self.provider.is_available()
+
+    def search(self, query: str, num_results: int = 5) -> List[Dict[str, Any]]:
+        normalized_query = ' '.join(query.lower().split())
+        cache_key = self.cache.generate_cache_key(normalized_query, self.get_provider_name(), num_results)
+
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        results = self.provider.search(query, num_results=num_results)
+        # Empty responses are usually transient failures, so they are not cached
+        if results:
+            self.cache.set(cache_key, results, ttl=self.ttl)
+        return results
@@ -0,0 +1,134 @@
+import time
+import zlib
+import sqlite3
+from typing import Optional, Dict, Any
+from app.core.sqlite_store import SQLiteConnections, StatCounters
+
+
+class PageContentCache:
+    """
+    On-disk cache of cleaned page text keyed by URL. Entries are stored
+    zlib-compressed together with the ETag/Last-Modified validators so stale
+    pages can be revalidated with a conditional GET instead of re-downloaded.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 200 * 1024 * 1024, max_age: int = 7 * 24 * 3600,
+                 revalidate_after: int = 3600):
+        """
+        Args:
+            path: SQLite file holding the cache
+            max_bytes: total compressed size kept before least-recently-used pages are evicted
+            max_age: seconds after which an entry is dropped regardless of validators
+            revalidate_after: seconds an entry is served without contacting the origin
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.revalidate_after = revalidate_after
+        self._connections = SQLiteConnections(path)
+        self._counters = StatCounters('hits', 'revalidated', 'misses', 'evictions')
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS page_cache ("
+                "url TEXT PRIMARY KEY, content BLOB NOT NULL, size INTEGER NOT NULL, "
+                "etag TEXT, last_modified TEXT, created_at REAL NOT NULL, "
+                "validated_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_page_cache_accessed ON page_cache (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        self._counters.add(counter, amount)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a page.
+        Returns a dict with "content", "etag", "last_modified" and "is_fresh"
+        (True when it can be used without revalidation), or None.
+        """
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT content, etag, last_modified, created_at, validated_at FROM page_cache WHERE url = ?",
+                    (url,)
+                ).fetchone()
+                if row is None:
+                    self._count('misses')
+                    return None
+                content, etag, last_modified, created_at, validated_at = row
+                if now - created_at > self.max_age:
+                    conn.execute("DELETE FROM page_cache WHERE url = ?", (url,))
+                    self._count('evictions')
+                    self._count('misses')
+                    return None
+                conn.execute("UPDATE page_cache SET accessed_at = ? WHERE url = ?", (now, url))
+        except sqlite3.Error as e:
+            print(f"Page cache read failed for {url}: {e}")
+            return None
+
+        is_fresh = now - validated_at <= self.revalidate_after
+        if is_fresh:
+            self._count('hits')
+        return {
+            "content": zlib.decompress(content).decode('utf-8'),
+            "etag": etag,
+            "last_modified": last_modified,
+            "is_fresh": is_fresh,
+        }
+
+    def set(self, url: str, content: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        """Store the cleaned text of a page, evicting old entries to stay under max_bytes"""
+        now = time.time()
+        compressed = zlib.compress(content.encode('utf-8'), 6)
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO page_cache "
+                    "(url, content, size, etag, last_modified, created_at, validated_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, compressed, len(compressed), etag, last_modified, now, now, now)
+                )
+                evicted = conn.execute("DELETE FROM page_cache WHERE created_at < ?", (now - self.max_age,)).rowcount
+                total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_cache").fetchone()[0]
+                while total > self.max_bytes:
+                    oldest = conn.execute(
+                        "SELECT url, size FROM page_cache WHERE url != ? ORDER BY accessed_at ASC LIMIT 1", (url,)
+                    ).fetchone()
+                    if oldest is None:
+                        break
+                    conn.execute("DELETE FROM page_cache WHERE url = ?", (oldest[0],))
+                    total -= oldest[1]
+                    evicted += 1
+            if evicted:
+                self._count('evictions', evicted)
+        except sqlite3.Error as e:
+            print(f"Page cache write failed for {url}: {e}")
+
+    def mark_revalidated(self, url: str) -> None:
+        """Record that the origin answered 304 Not Modified for a cached page"""
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.execute("UPDATE page_cache SET validated_at = ?, accessed_at = ? WHERE url = ?", (now, now, url))
+            self._count('revalidated')
+        except sqlite3.Error as e:
+            print(f"Page cache update failed for {url}: {e}")
+
+    def clear(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM page_cache")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = self._counters.snapshot()
+        try:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM page_cache"
+            ).fetchone()
+            stats.update({"entries": entries, "bytes": size})
+        except sqlite3.Error:
+            pass
+        return stats
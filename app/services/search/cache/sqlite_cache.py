@@ -0,0 +1,88 @@
+import json
+import time
+import sqlite3
+from typing import Optional, List, Dict, Any
+from app.core.sqlite_store import SQLiteConnections, StatCounters
+from .base import SearchCache
+
+
+class SQLiteSearchCache(SearchCache):
+    """
+    Persistent search cache in a local SQLite file. WAL mode lets every
+    gunicorn worker on the host read and write the same cache.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._connections = SQLiteConnections(path)
+        self._counters = StatCounters('hits', 'misses', 'evictions')
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                "cache_key TEXT PRIMARY KEY, results TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_search_cache_accessed ON search_cache (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _count(self, counter: str, amount: int = 1) -> None:
+        self._counters.add(counter, amount)
+
+    def get(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT results, expires_at FROM search_cache WHERE cache_key = ?", (cache_key,)
+                ).fetchone()
+                if row is None:
+                    self._count('misses')
+                    return None
+                if row[1] < now:
+                    conn.execute("DELETE FROM search_cache WHERE cache_key = ?", (cache_key,))
+                    self._count('evictions')
+                    self._count('misses')
+                    return None
+                conn.execute("UPDATE search_cache SET accessed_at = ? WHERE cache_key = ?", (now, cache_key))
+            self._count('hits')
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            print(f"Search cache read failed: {e}")
+            self._count('misses')
+            return None
+
+    def set(self, cache_key: str, results: List[Dict[str, Any]], ttl: int = 3600) -> None:
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_cache (cache_key, results, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (cache_key, json.dumps(results), now + ttl, now)
+                )
+                evicted = conn.execute("DELETE FROM search_cache WHERE expires_at < ?", (now,)).rowcount
+                overflow = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+                if overflow > 0:
+                    evicted += conn.execute(
+                        "DELETE FROM search_cache WHERE cache_key IN "
+                        "(SELECT cache_key FROM search_cache ORDER BY accessed_at ASC LIMIT ?)", (overflow,)
+                    ).rowcount
+            if evicted:
+                self._count('evictions', evicted)
+        except sqlite3.Error as e:
+            print(f"Search cache write failed: {e}")
+
+    def clear(self) -> None:
+        with self._connection() as conn:
+            conn.execute("DELETE FROM search_cache")
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = {"backend": "sqlite", **self._counters.snapshot()}
+        try:
+            stats["entries"] = self._connection().execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        except sqlite3.Error:
+            pass
+        return stats
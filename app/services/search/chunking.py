@@ -0,0 +1,41 @@
+import re
+from typing import List
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def split_into_passages(text: str, chunk_size: int = 800, overlap: int = 150) -> List[str]:
+    """
+    Split text into overlapping passages of roughly chunk_size characters.
+    Passages break on sentence boundaries where possible and each one starts
+    with up to `overlap` characters carried over from the previous passage.
+    """
+    text = ' '.join(text.split())
+    if len(text) <= chunk_size:
+        return [text] if text else []
+
+    sentences = _SENTENCE_END.split(text)
+    passages = []
+    current = ''
+    for sentence in sentences:
+        # Sentences longer than a whole passage are hard-wrapped on word boundaries
+        while len(sentence) > chunk_size:
+            cut = sentence.rfind(' ', 0, chunk_size)
+            cut = cut if cut > 0 else chunk_size
+            sentence_part, sentence = sentence[:cut], sentence[cut:].lstrip()
+            current = _flush(passages, current, sentence_part, chunk_size, overlap)
+        current = _flush(passages, current, sentence, chunk_size, overlap)
+    if current.strip():
+        passages.append(current.strip())
+    return passages
+
+
+def _flush(passages: List[str], current: str, addition: str, chunk_size: int, overlap: int) -> str:
+    """Append addition to the current passage, emitting it first if it would overflow"""
+    if current and len(current) + len(addition) + 1 > chunk_size:
+        passages.append(current.strip())
+        tail = current[-overlap:] if overlap else ''
+        # Start the carried-over tail on a word boundary
+        space = tail.find(' ')
+        current = tail[space + 1:] if space != -1 else tail
+    return f"{current} {addition}" if current else addition
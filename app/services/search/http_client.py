@@ -0,0 +1,58 @@
+import os
+import threading
+from typing import Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _accept_encoding() -> str:
+    # urllib3 decodes brotli only when a brotli package is installed
+    try:
+        import brotli  # noqa: F401
+        return 'gzip, deflate, br'
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            return 'gzip, deflate, br'
+        except ImportError:
+            return 'gzip, deflate'
+
+
+def get_timeout() -> Tuple[float, float]:
+    """(connect, read) timeouts for outbound requests: fail fast on unreachable hosts, allow slow bodies"""
+    return (
+        float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05)),
+        float(os.environ.get('HTTP_READ_TIMEOUT', 10))
+    )
+
+
+def get_http_session() -> requests.Session:
+    """
+    Return the process-wide requests.Session used by the search providers and the scraper.
+    Connections are pooled per host and kept alive, so repeated calls to the same API or
+    site skip DNS, TCP and TLS setup. A new session is made after a fork, since pooled
+    sockets must not be shared between worker processes.
+    """
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=int(os.environ.get('HTTP_POOL_HOSTS', 50)),
+                    pool_maxsize=int(os.environ.get('HTTP_POOL_SIZE', 10)),
+                    # Only connection failures are retried; a request that reached the server is not resent
+                    max_retries=Retry(total=int(os.environ.get('HTTP_CONNECT_RETRIES', 1)), read=0, status=0,
+                                      backoff_factor=0.2)
+                )
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers['Accept-Encoding'] = _accept_encoding()
+                _session = session
+                _session_pid = os.getpid()
+    return _session
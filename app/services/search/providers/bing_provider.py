@@ -1,6 +1,6 @@
 import os
-import requests
 from typing import List, Dict, Any
+from app.services.search.http_client import get_http_session, get_timeout
 from .base import SearchProvider
 
 class BingSearchProvider(SearchProvider):
@@ -24,7 +24,7 @@ class BingSearchProvider(SearchProvider):
             'q': query,
             'count': num_results
         }
-        response = requests.get(self.endpoint, headers=headers, params=params, timeout=10)
+        response = get_http_session().get(self.endpoint, headers=headers, params=params, timeout=get_timeout())
         response.raise_for_status()
         data = response.json()
         results = []
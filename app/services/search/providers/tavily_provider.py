@@ -1,6 +1,6 @@
 import os
-import requests
 from typing import List, Dict, Any
+from app.services.search.http_client import get_http_session, get_timeout
 from .base import SearchProvider
 
 class TavilySearchProvider(SearchProvider):
@@ -22,7 +22,7 @@ class TavilySearchProvider(SearchProvider):
             'query': query,
             'num_results': num_results
         }
-        response = requests.get(self.endpoint, params=params, timeout=10)
+        response = get_http_session().get(self.endpoint, params=params, timeout=get_timeout())
         response.raise_for_status()
         data = response.json()
         # Standardize results: title, content, url, score
@@ -0,0 +1,83 @@
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+
+class ParallelScraper:
+    """
+    Fetches pages concurrently with a process-wide concurrency limit, a per-host
+    politeness limit and a per-call time budget.
+    """
+
+    def __init__(self, fetch: Callable[[str], Optional[str]], max_concurrency: Optional[int] = None,
+                 per_host_limit: Optional[int] = None, min_host_interval: Optional[float] = None,
+                 time_budget: Optional[float] = None):
+        """
+        Args:
+            fetch: callable returning the cleaned page text for a URL, or None on failure
+            max_concurrency: maximum pages fetched at once across all requests (SCRAPE_MAX_CONCURRENCY)
+            per_host_limit: maximum simultaneous fetches against one host (SCRAPE_PER_HOST_LIMIT)
+            min_host_interval: minimum seconds between two request starts on one host (SCRAPE_HOST_INTERVAL)
+            time_budget: seconds a single scrape() call may take before pending pages are dropped (SCRAPE_TIME_BUDGET)
+        """
+        self.fetch = fetch
+        self.max_concurrency = max_concurrency or int(os.environ.get('SCRAPE_MAX_CONCURRENCY', 8))
+        self.per_host_limit = per_host_limit or int(os.environ.get('SCRAPE_PER_HOST_LIMIT', 2))
+        self.min_host_interval = min_host_interval if min_host_interval is not None else float(os.environ.get('SCRAPE_HOST_INTERVAL', 0.25))
+        self.time_budget = time_budget if time_budget is not None else float(os.environ.get('SCRAPE_TIME_BUDGET', 8))
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='scraper')
+        self._lock = threading.Lock()
+        self._host_semaphores: Dict[str, threading.Semaphore] = {}
+        self._host_next_slot: Dict[str, float] = {}
+
+    def scrape(self, urls: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Fetch all URLs concurrently.
+        Returns a mapping of URL to page text. URLs that failed map to None and URLs
+        still pending when the time budget ran out are omitted.
+        """
+        if not urls:
+            return {}
+
+        futures = {self._executor.submit(self._polite_fetch, url): url for url in urls}
+        done, not_done = wait(futures, timeout=self.time_budget)
+
+        for future in not_done:
+            # Queued fetches are dropped; in-flight ones finish in the background and are discarded
+            future.cancel()
+        if not_done:
+            print(f"Scrape budget of {self.time_budget:.1f}s exhausted, {len(not_done)} page(s) still pending.")
+
+        return {futures[future]: future.result() for future in done if not future.cancelled()}
+
+    def _polite_fetch(self, url: str) -> Optional[str]:
+        host = urlparse(url).netloc.lower()
+        with self._host_semaphore(host):
+            self._wait_for_host_slot(host)
+            try:
+                return self.fetch(url)
+            except Exception as e:
+                print(f"Scraping failed for {url}: {e}")
+                return None
+
+    def _host_semaphore(self, host: str) -> threading.Semaphore:
+        with self._lock:
+            semaphore = self._host_semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.Semaphore(self.per_host_limit)
+                self._host_semaphores[host] = semaphore
+            return semaphore
+
+    def _wait_for_host_slot(self, host: str) -> None:
+        """Space out request starts against the same host by min_host_interval"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._host_next_slot.get(host, now))
+            self._host_next_slot[host] = slot + self.min_host_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
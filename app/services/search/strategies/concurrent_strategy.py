@@ -0,0 +1,73 @@
+import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import List, Dict, Any, Tuple, Optional
+from app.services.search.providers.base import SearchProvider
+from .base import SearchStrategy
+
+
+class ConcurrentSearchStrategy(SearchStrategy):
+    """Fans a query out to every provider in parallel under a single deadline"""
+
+    def __init__(self, timeout: Optional[float] = None, max_workers: Optional[int] = None):
+        """
+        Args:
+            timeout: overall deadline in seconds for the whole fan-out (defaults to SEARCH_TIMEOUT or 6s)
+            max_workers: size of the shared thread pool (defaults to SEARCH_MAX_WORKERS or 8)
+        """
+        self.timeout = timeout if timeout is not None else float(os.environ.get('SEARCH_TIMEOUT', 6))
+        workers = max_workers or int(os.environ.get('SEARCH_MAX_WORKERS', 8))
+        # A long-lived pool: providers that miss the deadline keep running in the
+        # background instead of blocking the request on executor shutdown.
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='search')
+
+    def execute_search(self, query: str, providers: List[SearchProvider], num_results: int = 5) -> List[Dict[str, Any]]:
+        results, _ = self.execute_search_with_report(query, providers, num_results)
+        return results
+
+    def execute_search_with_report(self, query: str, providers: List[SearchProvider],
+                                   num_results: int = 5) -> Tuple[List[Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+        """
+        Run all provider searches concurrently and return whatever arrived before the deadline.
+        Returns:
+            (results, report) where report maps provider name to
+            {"status": "ok" | "error" | "timeout", "latency": seconds, "count": int, "error": str}
+        """
+        if not providers:
+            return [], {}
+
+        started = time.monotonic()
+        futures = {
+            self._executor.submit(self._timed_search, provider, query, num_results): provider
+            for provider in providers
+        }
+        done, not_done = wait(futures, timeout=self.timeout)
+
+        results = []
+        report = {}
+        # Iterate in provider order so result ordering stays deterministic
+        for future, provider in futures.items():
+            name = provider.get_provider_name()
+            if future in not_done:
+                future.cancel()
+                report[name] = {"status": "timeout", "latency": time.monotonic() - started, "count": 0}
+                continue
+            provider_results, latency, error = future.result()
+            if error:
+                report[name] = {"status": "error", "latency": latency, "count": 0, "error": error}
+            else:
+                results.extend(provider_results)
+                report[name] = {"status": "ok", "latency": latency, "count": len(provider_results)}
+
+        for name, entry in report.items():
+            logging.info(f"Search provider '{name}': {entry['status']} in {entry['latency']:.2f}s ({entry['count']} results)")
+        return results, report
+
+    @staticmethod
+    def _timed_search(provider: SearchProvider, query: str, num_results: int):
+        start = time.monotonic()
+        try:
+            return provider.search(query, num_results=num_results), time.monotonic() - start, None
+        except Exception as e:
+            return [], time.monotonic() - start, str(e)
@@ -1,7 +1,7 @@
 import { audioBlob, cancelAudioRecording } from './audio.js';
 import { removeFilePreview } from './ui.js';
 import { quotedText, removeQuote } from './quote.js';
-import { setActiveChatId, updateChatTitleInList } from './history.js';
+import { setActiveChatId, updateChatTitleInList, fetchChatHistory } from './history.js';
 import * as ui from './ui.js';
 
 const messagesContainer = document.getElementById('messages');
@@ -11,8 +11,13 @@ window.fileContents = {};
 let currentChatId = null;
 let isProcessing = false;
 let abortController = null;
+let currentGenerationId = null;
 let tippyInstances = [];
 
+// Reconnect attempts for a dropped chat stream, with exponential backoff from the base delay
+const MAX_STREAM_RECONNECTS = 5;
+const STREAM_RECONNECT_DELAY_MS = 500;
+
 // Store sources on a per-message basis, using the message element as a key
 const messageSources = new WeakMap();
 
@@ -20,6 +25,10 @@ export const getIsProcessing = () => isProcessing;
 export function cancelCurrentRequest() {
     if (abortController) {
         abortController.abort();
+        // Generation continues server-side after a disconnect unless it is cancelled explicitly
+        if (currentGenerationId) {
+            fetch(`/api/chat/streams/${currentGenerationId}`, { method: 'DELETE', keepalive: true }).catch(() => {});
+        }
         tippyInstances.forEach(instance => instance.destroy());
         tippyInstances = [];
     }
@@ -90,6 +99,60 @@ function renderSourceList(botMessageDiv, sources) {
     messageBody.appendChild(container);
 }
 
+/**
+ * Polls a background post-processing job until it finishes and applies the generated title.
+ * @param {string|null} jobId - Job id from the 'post_processing' stream event.
+ * @param {number} chatId - The chat the job belongs to.
+ */
+async function pollPostProcessing(jobId, chatId) {
+    if (!jobId) {
+        // The job ran inline on the server, so the title is already saved
+        fetchChatHistory();
+        return;
+    }
+    for (let attempt = 0; attempt < 30; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        try {
+            const response = await fetch(`/api/jobs/${jobId}`);
+            if (!response.ok) break;
+            const job = await response.json();
+            if (job.status === 'done') {
+                if (job.result && job.result.title) updateChatTitleInList(chatId, job.result.title);
+                return;
+            }
+            if (job.status === 'failed') return;
+        } catch (error) {
+            console.error('Error polling post-processing job:', error);
+            break;
+        }
+    }
+    fetchChatHistory();
+}
+
+/**
+ * Splits buffered stream text into complete SSE frames.
+ * Frames may arrive split across reads, so any incomplete tail is returned as `rest`.
+ * Comment lines (heartbeats) are skipped.
+ * @param {string} text - Buffered, decoded stream text.
+ * @returns {{frames: Array<{id: string|null, data: string}>, rest: string}}
+ */
+function parseSSEFrames(text) {
+    const blocks = text.split('\n\n');
+    const rest = blocks.pop();
+    const frames = [];
+    for (const block of blocks) {
+        let id = null;
+        const dataLines = [];
+        for (const line of block.split('\n')) {
+            if (line.startsWith(':')) continue;
+            if (line.startsWith('id:')) id = line.substring(3).trim();
+            else if (line.startsWith('data:')) dataLines.push(line.substring(5).replace(/^ /, ''));
+        }
+        if (id !== null || dataLines.length) frames.push({ id, data: dataLines.join('\n') });
+    }
+    return { frames, rest };
+}
+
 export async function sendMessage(message, isSearchEnabled, isResearchMode, files, existingAttachments = null, onStateChangeCallback) {
     if (isProcessing) return;
     isProcessing = true;
@@ -159,6 +222,74 @@ export async function sendMessage(message, isSearchEnabled, isResearchMode, file
     }
 
     let currentContainer = botTextDiv;
+    let lastEventId = null;
+    let streamCompleted = false;
+
+    function handleStreamEvent(data) {
+        switch (data.type) {
+            case 'chat_info':
+                if (data.chat_id && !currentChatId) setCurrentChatId(data.chat_id);
+                break;
+            case 'status':
+                if (botTextDiv.querySelector('.typing-indicator')) botTextDiv.innerHTML = `<div class="status-update">${data.message}</div>`;
+                break;
+            case 'response_chunk':
+                accumulatedResponse += data.content;
+                if (isResearchMode) {
+                    processChunk(data.content);
+                } else {
+                    botTextDiv.innerHTML = marked.parse(accumulatedResponse);
+                }
+                messagesContainer.scrollTop = messagesContainer.scrollHeight;
+                break;
+            case 'sources':
+                // FIX: Re-introduce source list rendering
+                renderSourceList(botMessageDiv, data.data);
+                break;
+            case 'title_update':
+                updateChatTitleInList(data.chat_id, data.title);
+                break;
+            case 'post_processing':
+                if (data.title_pending) pollPostProcessing(data.job_id, data.chat_id);
+                break;
+            case 'done':
+                streamCompleted = true;
+                break;
+            case 'resume_unavailable':
+                // The server no longer has the rest of this response buffered
+                streamCompleted = true;
+                botTextDiv.insertAdjacentHTML('beforeend', '<div class="status-update"><em>Connection lost. Reopen this chat to see the full response.</em></div>');
+                break;
+            case 'error':
+                botTextDiv.innerHTML = `<div class="error-message">${data.message}</div>`;
+                throw new Error(data.message);
+        }
+    }
+
+    async function readStream(response) {
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let sseBuffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            sseBuffer += decoder.decode(value, { stream: true });
+            const parsed = parseSSEFrames(sseBuffer);
+            sseBuffer = parsed.rest;
+
+            for (const frame of parsed.frames) {
+                if (frame.id !== null) lastEventId = frame.id;
+                if (!frame.data) continue;
+                try {
+                    handleStreamEvent(JSON.parse(frame.data));
+                } catch (e) {
+                    console.error("Error parsing stream data:", frame.data, e);
+                }
+            }
+        }
+    }
 
     try {
         const response = await fetch('/api/chat', {
@@ -171,63 +302,37 @@ export async function sendMessage(message, isSearchEnabled, isResearchMode, file
         if (!response.ok) throw new Error(`Network response was not ok: ${response.statusText}`);
         if (!response.body) throw new Error("ReadableStream not supported.");
 
-        const reader = response.body.getReader();
-        const decoder = new TextDecoder();
+        const generationId = response.headers.get('X-Generation-Id');
+        currentGenerationId = generationId;
+        try {
+            await readStream(response);
+        } catch (error) {
+            if (error.name === 'AbortError' || !generationId) throw error;
+            console.warn('Chat stream interrupted, reconnecting:', error);
+        }
 
-        while (true) {
-            const { done, value } = await reader.read();
-            if (done) {
-                if (buffer.length > 0) {
-                    currentContainer.append(document.createTextNode(buffer));
-                    buffer = '';
-                }
-                break;
-            }
-            
-            const chunk = decoder.decode(value, { stream: true });
-            const lines = chunk.split('\n\n');
-
-            for (const line of lines) {
-                if (line.startsWith('data:')) {
-                    const dataStr = line.substring(5).trim();
-                    if (!dataStr) continue;
-
-                    try {
-                        const data = JSON.parse(dataStr);
-                        
-                        switch (data.type) {
-                            case 'chat_info':
-                                if (data.chat_id && !currentChatId) setCurrentChatId(data.chat_id);
-                                break;
-                            case 'status':
-                                if (botTextDiv.querySelector('.typing-indicator')) botTextDiv.innerHTML = `<div class="status-update">${data.message}</div>`;
-                                break;
-                            case 'response_chunk':
-                                accumulatedResponse += data.content;
-                                if (isResearchMode) {
-                                    processChunk(data.content);
-                                } else {
-                                    botTextDiv.innerHTML = marked.parse(accumulatedResponse);
-                                }
-                                messagesContainer.scrollTop = messagesContainer.scrollHeight;
-                                break;
-                            case 'sources':
-                                // FIX: Re-introduce source list rendering
-                                renderSourceList(botMessageDiv, data.data);
-                                break;
-                            case 'title_update':
-                                updateChatTitleInList(data.chat_id, data.title);
-                                break;
-                            case 'error':
-                                botTextDiv.innerHTML = `<div class="error-message">${data.message}</div>`;
-                                throw new Error(data.message);
-                        }
-                    } catch (e) {
-                        console.error("Error parsing stream data:", dataStr, e);
-                    }
-                }
+        // The server keeps generating after a dropped connection; resume after the last event received
+        for (let attempt = 0; !streamCompleted && generationId && attempt < MAX_STREAM_RECONNECTS; attempt++) {
+            await new Promise(resolve => setTimeout(resolve, STREAM_RECONNECT_DELAY_MS * 2 ** attempt));
+            try {
+                const resumed = await fetch(`/api/chat/streams/${generationId}`, {
+                    headers: lastEventId ? { 'Last-Event-ID': lastEventId } : {},
+                    signal: abortController.signal
+                });
+                if (resumed.status === 404) break; // expired, or buffered by another worker process
+                if (resumed.ok && resumed.body) await readStream(resumed);
+            } catch (error) {
+                if (error.name === 'AbortError') throw error;
+                console.warn('Chat stream reconnect failed:', error);
             }
         }
+        // Tell the user rather than leave a silently truncated answer
+        if (!streamCompleted && generationId) handleStreamEvent({ type: 'resume_unavailable' });
+
+        if (buffer.length > 0) {
+            currentContainer.append(document.createTextNode(buffer));
+            buffer = '';
+        }
         
     } catch (error) {
         if (error.name === 'AbortError') {
@@ -240,6 +345,7 @@ export async function sendMessage(message, isSearchEnabled, isResearchMode, file
     } finally {
         isProcessing = false;
         abortController = null;
+        currentGenerationId = null;
         onStateChangeCallback();
         if (!isResearchMode) {
             botTextDiv.querySelectorAll('pre code').forEach(block => hljs.highlightElement(block));
@@ -7,9 +7,20 @@ const appContainer = document.getElementById('appContainer');
 const sidebar = document.getElementById('sidebar');
 const messagesContainer = document.getElementById('messages');
 
+const PAGE_SIZE = 50;
+// Start loading the next page when the user scrolls within this many pixels of the end
+const SCROLL_THRESHOLD = 150;
+// History responses kept for revalidation with If-None-Match
+const MAX_CACHED_RESPONSES = 100;
+
 let chats = [];
 let activeChatId = null;
 let closeTimeout;
+let chatsCursor = null;
+let isLoadingChats = false;
+let messagesCursor = null;
+let isLoadingMessages = false;
+const responseCache = new Map(); // url -> { etag, data }, least recently used first
 
 export function setActiveChatId(id) {
     activeChatId = id;
@@ -24,12 +35,39 @@ export function setActiveChatId(id) {
     }
 }
 
+/**
+ * GET a history endpoint, revalidating any cached copy with its ETag. A 304 answer is
+ * served from the cache, so unchanged chats and messages cost one small round trip.
+ * Returns a copy the caller may modify, or null when the request failed.
+ */
+async function fetchCachedJSON(url) {
+    const cached = responseCache.get(url);
+    const response = await fetch(url, { headers: cached ? { 'If-None-Match': cached.etag } : {} });
+    if (response.status === 304 && cached) {
+        responseCache.delete(url);
+        responseCache.set(url, cached);
+        return structuredClone(cached.data);
+    }
+    if (!response.ok) return null;
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    responseCache.delete(url);
+    if (etag) {
+        responseCache.set(url, { etag, data: structuredClone(data) });
+        if (responseCache.size > MAX_CACHED_RESPONSES) {
+            responseCache.delete(responseCache.keys().next().value);
+        }
+    }
+    return data;
+}
+
 export async function fetchChatHistory() {
     try {
-        const response = await fetch('/api/chats');
-        if (response.ok) {
-            const data = await response.json();
+        const data = await fetchCachedJSON(`/api/chats?limit=${PAGE_SIZE}`);
+        if (data) {
             chats = data.chats;
+            chatsCursor = data.next_cursor;
             renderChatHistory();
         }
     } catch (error) {
@@ -37,6 +75,24 @@ export async function fetchChatHistory() {
     }
 }
 
+async function loadMoreChats() {
+    if (!chatsCursor || isLoadingChats) return;
+    isLoadingChats = true;
+    try {
+        const data = await fetchCachedJSON(`/api/chats?limit=${PAGE_SIZE}&before=${encodeURIComponent(chatsCursor)}`);
+        if (data) {
+            const knownIds = new Set(chats.map(c => c.id));
+            chats = chats.concat(data.chats.filter(c => !knownIds.has(c.id)));
+            chatsCursor = data.next_cursor;
+            renderChatHistory();
+        }
+    } catch (error) {
+        console.error('Error loading more chats:', error);
+    } finally {
+        isLoadingChats = false;
+    }
+}
+
 function renderChatHistory() {
     chatHistoryContainer.innerHTML = '';
     if (chats.length === 0) {
@@ -235,22 +291,24 @@ async function deleteChat(chatId, chatItem) {
 }
 
 
+function renderHistoryMessage(message) {
+    if (message.role === 'user') {
+        return addMessageToUI('user', { text: message.content });
+    }
+    return addMessageToUI('assistant', message.content);
+}
+
 export async function loadChat(chatId) {
     if (activeChatId === chatId) return;
     setActiveChatId(chatId);
+    messagesCursor = null;
 
     try {
-        const response = await fetch(`/api/chats/${chatId}/messages`);
-        if (response.ok) {
-            const data = await response.json();
+        const data = await fetchCachedJSON(`/api/chats/${chatId}/messages?limit=${PAGE_SIZE}`);
+        if (data && activeChatId === chatId) {
             messagesContainer.innerHTML = ''; 
-            data.messages.forEach(message => {
-                if (message.role === 'user') {
-                    addMessageToUI('user', { text: message.content });
-                } else {
-                    addMessageToUI('assistant', message.content);
-                }
-            });
+            data.messages.forEach(renderHistoryMessage);
+            messagesCursor = data.next_cursor;
             messagesContainer.scrollTop = messagesContainer.scrollHeight;
         }
     } catch (error) {
@@ -258,8 +316,33 @@ export async function loadChat(chatId) {
     }
 }
 
+async function loadOlderMessages() {
+    if (!messagesCursor || isLoadingMessages || !activeChatId) return;
+    const chatId = activeChatId;
+    isLoadingMessages = true;
+    try {
+        const data = await fetchCachedJSON(`/api/chats/${chatId}/messages?limit=${PAGE_SIZE}&before=${encodeURIComponent(messagesCursor)}`);
+        if (data && activeChatId === chatId) {
+            // Prepend older messages and keep the user's current message in view
+            const anchor = messagesContainer.firstChild;
+            const previousHeight = messagesContainer.scrollHeight;
+            const previousTop = messagesContainer.scrollTop;
+            data.messages.forEach(message => {
+                messagesContainer.insertBefore(renderHistoryMessage(message), anchor);
+            });
+            messagesContainer.scrollTop = previousTop + (messagesContainer.scrollHeight - previousHeight);
+            messagesCursor = data.next_cursor;
+        }
+    } catch (error) {
+        console.error(`Error loading older messages for chat ${chatId}:`, error);
+    } finally {
+        isLoadingMessages = false;
+    }
+}
+
 export function handleNewChat() {
     setActiveChatId(null);
+    messagesCursor = null;
     messagesContainer.innerHTML = `
         <div class="welcome-message">
             <div class="welcome-icon"><i class="fas fa-robot"></i></div>
@@ -285,6 +368,14 @@ export function initializeChatHistory() {
     fetchChatHistory();
     newChatBtn.addEventListener('click', handleNewChat);
 
+    chatHistoryContainer.addEventListener('scroll', () => {
+        const distanceToBottom = chatHistoryContainer.scrollHeight - chatHistoryContainer.scrollTop - chatHistoryContainer.clientHeight;
+        if (distanceToBottom < SCROLL_THRESHOLD) loadMoreChats();
+    });
+    messagesContainer.addEventListener('scroll', () => {
+        if (messagesContainer.scrollTop < SCROLL_THRESHOLD) loadOlderMessages();
+    });
+
     const hoverAreaElements = [sidebar, headerSidebarToggle, newChatBtn];
 
     hoverAreaElements.forEach(el => {
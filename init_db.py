@@ -116,6 +116,39 @@ def run_migrations():
         print(f"❌ An unexpected error occurred during migrations: {e}")
         return False
 
+def create_performance_indexes():
+    """Create the hot-path indexes declared on the models on databases that predate them."""
+    print("\n📝 Ensuring query indexes exist...")
+    try:
+        from app import create_app
+        from app.models import Chat, Message, UserMemory, MemorySource
+        from app.core.extensions import db
+
+        app = create_app()
+        with app.app_context():
+            created = 0
+            for model in (Chat, Message, UserMemory, MemorySource):
+                existing = {index['name']: index['column_names'] for index in db.inspect(db.engine).get_indexes(model.__table__.name)}
+                for index in model.__table__.indexes:
+                    columns = [column.name for column in index.columns]
+                    if index.name in existing and existing[index.name] != columns:
+                        # The declared columns changed (e.g. a pagination tie-break was appended)
+                        index.drop(bind=db.engine)
+                        print(f"    ♻️  Rebuilding index {index.name}")
+                    elif index.name in existing:
+                        continue
+                    index.create(bind=db.engine)
+                    print(f"    ✅ Created index {index.name}")
+                    created += 1
+            if not created:
+                print("✅ All query indexes already exist.")
+            return True
+
+    except Exception as e:
+        print(f"❌ Failed to create query indexes: {e}")
+        return False
+
+
 def seed_memory_categories():
     """Pre-populates the memory_categories table with default values."""
     print("\n📝 Seeding memory categories...")
@@ -227,6 +260,7 @@ def main():
     if not load_environment(): sys.exit(1)
     if not check_postgresql_connection(): sys.exit(1)
     if not run_migrations(): sys.exit(1)
+    if not create_performance_indexes(): sys.exit(1)
     
     # Add the new seeding step
     if not seed_memory_categories(): sys.exit(1)
@@ -0,0 +1,86 @@
+"""Smoke tests for the SQLite-backed caches, job store and stream buffer (run with pytest)."""
+import time
+import pytest
+
+from app.core.sqlite_store import SQLiteConnections, StatCounters
+from app.core.tasks import LocalJobStore, SQLiteJobStore
+from app.core.stream_buffer import SQLiteStreamBuffer
+from app.services.search.cache.sqlite_cache import SQLiteSearchCache
+from app.services.search.cache.page_cache import PageContentCache
+
+
+def _job(job_id, serial_key=None):
+    return {"id": job_id, "name": "test", "payload": {}, "status": "pending",
+            "created_at": time.time(), "serial_key": serial_key}
+
+
+def test_connections_are_per_thread_and_wal(tmp_path):
+    connections = SQLiteConnections(str(tmp_path / 'nested' / 'db.sqlite3'))
+    conn = connections.get()
+    assert connections.get() is conn
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+
+
+def test_stat_counters():
+    counters = StatCounters('hits', 'misses')
+    counters.add('hits')
+    counters.add('misses', 3)
+    assert counters.snapshot() == {"hits": 1, "misses": 3}
+
+
+def test_search_cache_round_trip(tmp_path):
+    cache = SQLiteSearchCache(str(tmp_path / 'search.sqlite3'))
+    cache.set('key', [{"title": "a"}])
+    assert cache.get('key') == [{"title": "a"}]
+    assert cache.get('missing') is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_page_cache_round_trip(tmp_path):
+    cache = PageContentCache(str(tmp_path / 'pages.sqlite3'))
+    cache.set('https://example.com', 'page text', etag='"v1"')
+    page = cache.get('https://example.com')
+    assert page["content"] == 'page text' and page["etag"] == '"v1"' and page["is_fresh"]
+
+
+def test_stream_buffer_resume(tmp_path):
+    buffer = SQLiteStreamBuffer(str(tmp_path / 'streams.sqlite3'), max_events=2)
+    buffer.start('gen', owner_id=7)
+    for i in range(3):
+        buffer.append('gen', {"n": i})
+    buffer.finish('gen')
+    assert buffer.owner('gen') == 7
+    assert buffer.read('gen', 1, timeout=0) == ([(2, {"n": 1}), (3, {"n": 2})], True, False)
+    # Event 1 already fell out of the ring
+    assert buffer.read('gen', 0, timeout=0)[2] is True
+    assert buffer.read('unknown', 0, timeout=0) is None
+
+
+@pytest.mark.parametrize('make_store', [
+    lambda tmp_path: LocalJobStore(),
+    lambda tmp_path: SQLiteJobStore(str(tmp_path / 'tasks.sqlite3')),
+])
+def test_job_store_serializes_by_key(tmp_path, make_store):
+    store = make_store(tmp_path)
+    store.put(_job('1', 'chat:1'))
+    store.put(_job('2', 'chat:1'))
+    store.put(_job('3', 'chat:2'))
+    assert store.claim(0)['id'] == '1'
+    assert store.claim(0)['id'] == '3'
+    assert store.claim(0) is None  # job 2 waits for job 1
+    store.finish('1', 'done', result={"ok": True})
+    assert store.claim(0)['id'] == '2'
+    assert store.get('1')['result'] == {"ok": True}
+
+
+def test_disk_embedding_store_round_trip(tmp_path):
+    np = pytest.importorskip('numpy')
+    from app.services.embedding_service import DiskEmbeddingStore
+
+    store = DiskEmbeddingStore(str(tmp_path / 'embeddings'))
+    vectors = np.arange(6, dtype=np.float32).reshape(2, 3)
+    store.put_many(['a', 'b'], vectors)
+    found = store.get_many(['a', 'b', 'c'])
+    assert set(found) == {'a', 'b'}
+    assert np.array_equal(found['b'], vectors[1])